@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator
+from folderOrganizer import FolderOrganizer
+
+
+@dataclass
+class OrganizeProgress:
+    """Progress of an asynchronous organize or undo, reported after each file."""
+    phase: str  # 'organize' or 'undo'
+    done: int
+    total: int
+    name: str
+    category: str | None = None
+    error: str | None = None
+
+
+class AsyncFolderOrganizer:
+    def __init__(self, organizer: FolderOrganizer | None = None, max_workers: int = 8):
+        """
+        Asyncio front end of a FolderOrganizer, running every filesystem call on a bounded thread pool.
+
+        Several directories can be organized concurrently from one event loop, they share the
+        organizer's move histories and journal.
+
+        Args:
+            organizer (FolderOrganizer | None): Organizer to drive, a default one is created if None
+            max_workers (int): Number of threads for filesystem calls, and of moves in flight per operation
+        """
+        self.organizer = FolderOrganizer() if organizer is None else organizer
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-organizer')
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def _reports(self, function, *args) -> AsyncIterator[tuple]:
+        """
+        Run function(*args, cancel_event, on_file) on the thread pool, yielding the arguments of each on_file call.
+
+        Closing the iterator, or cancelling the task consuming it, sets cancel_event and waits for the function
+        to return, so the moves it made are always recorded.
+        """
+        loop = asyncio.get_running_loop()
+        reports: asyncio.Queue = asyncio.Queue()
+        cancel_event = threading.Event()
+
+        def on_file(*report) -> None:
+            loop.call_soon_threadsafe(reports.put_nowait, report)
+
+        run = asyncio.ensure_future(self._run(function, *args, cancel_event, on_file))
+        getter = None
+        try:
+            # The files reported before the run ended are queued before it completes
+            while not run.done() or not reports.empty():
+                if reports.empty():
+                    getter = asyncio.ensure_future(reports.get())
+                    await asyncio.wait({getter, run}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    yield getter.result()
+                else:
+                    yield reports.get_nowait()
+            run.result()
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if not run.done():
+                cancel_event.set()
+                await asyncio.wait({run})
+
+    async def organize_folder(self, directory: str) -> AsyncIterator[OrganizeProgress]:
+        """
+        Organize a directory, yielding an OrganizeProgress after each file.
+
+        The plan is executed like FolderOrganizer.execute_plan, with max_workers moving threads.
+        Cancelling the consuming task, or closing the iterator, stops starting new moves. Moves already
+        running are waited for, and every completed move is recorded in the undo history in plan order.
+        """
+        plan = await self._run(self.organizer.plan_organization, directory, False)
+        history = self.organizer._new_move_history(plan.directory)
+        done_count = 0
+        try:
+            async with aclosing(self._reports(self.organizer._move_plan, plan, history, self.max_workers)) as reports:
+                async for name, category, error in reports:
+                    done_count += 1
+                    yield OrganizeProgress('organize', done_count, len(plan), name, category, error)
+        finally:
+            self.organizer.finish_operation(history)
+            self.organizer.create_move_history(history)
+
+    async def undo_last_operation(self) -> AsyncIterator[OrganizeProgress]:
+        """
+        Undo the last operation like FolderOrganizer.undo_last_operation, yielding an OrganizeProgress
+        after each file.
+
+        If cancelled, the moves that were not undone yet are put back in the history as the last operation,
+        so undoing again resumes where it stopped.
+        """
+        if not self.organizer.move_histories:
+            return
+
+        total = len(self.organizer.move_histories[-1])
+        done_count = 0
+        async with aclosing(self._reports(self.organizer._undo_last_operation, self.max_workers)) as reports:
+            async for path, error in reports:
+                done_count += 1
+                yield OrganizeProgress('undo', done_count, total, os.path.basename(path), error=error)
+
+    async def close(self) -> None:
+        """Wait for running filesystem calls and release the thread pool."""
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
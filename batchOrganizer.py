@@ -0,0 +1,294 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List
+from folderOrganizer import FolderOrganizer
+from moveEngine import MoveEngine
+from moveJournal import MoveJournal
+from organizerEvents import OrganizerEvent, PhaseFinished
+from rateLimiter import RateLimiter, parse_size, save_limits
+
+SUMMARY_FORMAT = 'folder-organizer-batch'
+SUMMARY_VERSION = 1
+
+
+def organize_directory(directory: str, mode: str | None = None, workers: int = 1, collision_policy: str = 'rename',
+                       undo: bool = False, limits: Dict | None = None) -> Dict:
+    """
+    Organize or undo one directory, in a process of the batch's pool. Never raises, failures are reported.
+
+    The undo history is kept in the directory's own journal, like the organizer CLI does, so each
+    directory can be undone on its own later. limits holds the RateLimiter arguments, and optionally
+    a 'limits_file' it watches, None to move as fast as possible.
+    """
+    start_time = time.perf_counter()
+    result = {'directory': directory, 'operation': 'undo' if undo else 'organize', 'status': 'ok',
+              'files': 0, 'errors': 0, 'seconds': 0.0, 'message': None}
+    finished: List[PhaseFinished] = []
+
+    def sink(event: OrganizerEvent) -> None:
+        if isinstance(event, PhaseFinished) and event.phase in ('organize', 'undo'):
+            finished.append(event)
+
+    journal = None
+    try:
+        journal = MoveJournal.next_to(directory)
+        move_engine = None
+        if limits is not None:
+            limits = dict(limits)
+            limits_file = limits.pop('limits_file', None)
+            rate_limiter = RateLimiter(**limits)
+            if limits_file is not None:
+                rate_limiter.watch(limits_file)
+            move_engine = MoveEngine(rate_limiter=rate_limiter)
+        organizer = FolderOrganizer(move_engine=move_engine, journal=journal, event_sink=sink,
+                                    collision_policy=collision_policy)
+        if undo:
+            organizer.undo_last_operation(workers)
+        elif mode is None:
+            organizer.organize_folder(directory, workers)
+        else:
+            organizer.organize_tree(directory, mode, workers)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['message'] = f"{type(e).__name__}: {e}"
+    finally:
+        if journal is not None:
+            journal.close()
+
+    result['files'] = sum(event.files for event in finished)
+    result['errors'] = sum(event.errors for event in finished)
+    if result['status'] == 'ok' and result['errors']:
+        result['status'] = 'partial'
+    result['seconds'] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def expand_directories(patterns: Iterable[str]) -> List[str]:
+    """Expand paths and glob patterns into the existing directories they name, each once, in order."""
+    directories = []
+    seen = set()
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) if any(char in pattern for char in '*?[') else [pattern]
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in seen and os.path.isdir(path):
+                seen.add(path)
+                directories.append(path)
+    return directories
+
+
+class BatchOrganizer:
+    def __init__(self, processes: int | None = None, per_device: int = 2, mode: str | None = None, workers: int = 1,
+                 collision_policy: str = 'rename', on_result: Callable[[Dict], None] | None = None,
+                 limits: Dict | None = None):
+        """
+        Organize many directories at once, on a pool of processes.
+
+        Directories are grouped by the device they are on, and at most per_device of them are organized
+        at the same time on each device, so one disk isn't thrashed while others sit idle. Devices take
+        turns for the free processes. A directory that fails doesn't stop the others.
+
+        Rate limits are for the whole batch: each process gets an equal share of them.
+
+        Args:
+            processes (int | None): Number of worker processes, one per CPU by default
+            per_device (int): Maximum number of directories organized at once on the same device
+            mode (str | None): None organizes each directory alone like organize_folder,
+                               'flatten' or 'in_place' organizes each tree like organize_tree
+            workers (int): Number of threads moving files within each directory
+            collision_policy (str): Collision policy of the organizers, see FolderOrganizer
+            on_result (Callable | None): Called with the result of each directory as soon as it is done
+            limits (Dict | None): RateLimiter arguments, with an optional 'limits_file' to watch, None for no limit
+        """
+        if per_device < 1:
+            raise ValueError(f"At least one directory per device must be organized at once: {per_device}")
+        self.processes = processes or os.cpu_count() or 1
+        self.per_device = per_device
+        self.mode = mode
+        self.workers = workers
+        self.collision_policy = collision_policy
+        self.on_result = on_result
+        self.limits = limits
+
+    def run(self, directories: Iterable[str], undo: bool = False) -> Dict:
+        """Organize, or undo the last organization of, every directory. Returns the batch summary."""
+        started = time.time()
+        start_time = time.perf_counter()
+        results: List[Dict] = []
+
+        # Directories waiting, by device
+        queues: Dict[int, deque] = {}
+        for directory in directories:
+            try:
+                queues.setdefault(os.stat(directory).st_dev, deque()).append(directory)
+            except OSError as e:
+                self._add_result(results, self._failed(directory, undo, e))
+
+        total = sum(len(waiting) for waiting in queues.values())
+        processes = max(1, min(self.processes, total))
+        running: Counter = Counter()
+        futures: Dict[Future, tuple] = {}
+        executor = ProcessPoolExecutor(max_workers=processes)
+        limits = None if self.limits is None else dict(self.limits, share=1 / processes)
+
+        def submit_ready() -> None:
+            nonlocal executor
+            # One directory per device per round, so every device gets a process before any gets two
+            submitted = True
+            while submitted and len(futures) < processes:
+                submitted = False
+                for device, waiting in queues.items():
+                    if not waiting or running[device] >= self.per_device or len(futures) >= processes:
+                        continue
+                    directory = waiting.popleft()
+                    try:
+                        future = executor.submit(organize_directory, directory, self.mode, self.workers,
+                                                 self.collision_policy, undo, limits)
+                    except BrokenProcessPool:
+                        # A worker process died, the directories it had fail with it, the others go on in a new pool
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=processes)
+                        future = executor.submit(organize_directory, directory, self.mode, self.workers,
+                                                 self.collision_policy, undo, limits)
+                    futures[future] = (directory, device)
+                    running[device] += 1
+                    submitted = True
+
+        try:
+            submit_ready()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, device = futures.pop(future)
+                    running[device] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = self._failed(directory, undo, e)
+                    self._add_result(results, result)
+                submit_ready()
+        finally:
+            executor.shutdown()
+
+        return self.summary(results, started, time.perf_counter() - start_time, processes, undo)
+
+    def _add_result(self, results: List[Dict], result: Dict) -> None:
+        results.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    @staticmethod
+    def _failed(directory: str, undo: bool, error: BaseException) -> Dict:
+        return {'directory': directory, 'operation': 'undo' if undo else 'organize', 'status': 'failed',
+                'files': 0, 'errors': 0, 'seconds': 0.0, 'message': f"{type(error).__name__}: {error}"}
+
+    def summary(self, results: List[Dict], started: float, elapsed: float, processes: int, undo: bool) -> Dict:
+        """Consolidate the directory results, sorted by directory."""
+        statuses = Counter(result['status'] for result in results)
+        files = sum(result['files'] for result in results)
+        return {
+            'format': SUMMARY_FORMAT,
+            'version': SUMMARY_VERSION,
+            'operation': 'undo' if undo else 'organize',
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(started)),
+            'elapsed_seconds': round(elapsed, 3),
+            'host': platform.node(),
+            'processes': processes,
+            'per_device': self.per_device,
+            'mode': self.mode,
+            'totals': {
+                'directories': len(results),
+                'ok': statuses['ok'],
+                'partial': statuses['partial'],
+                'failed': statuses['failed'],
+                'files': files,
+                'errors': sum(result['errors'] for result in results),
+                'files_per_second': round(files / elapsed, 1) if elapsed else None,
+            },
+            'directories': sorted(results, key=lambda result: result['directory']),
+        }
+
+
+def print_result(result: Dict) -> None:
+    """Print a line per finished directory."""
+    line = f"[{result['status']}] {result['directory']}: {result['files']} files in {result['seconds']:.1f}s"
+    if result['errors']:
+        line += f", {result['errors']} errors"
+    if result['message']:
+        line += f" ({result['message']})"
+    print(line)
+
+
+def positive_int(text: str) -> int:
+    """Parse a whole number of at least 1, for the command line."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Organize many directories in parallel, each with its own undo "
+                                                 "history.")
+    parser.add_argument('directories', nargs='*', help="directories or glob patterns like '/home/*/Downloads'")
+    parser.add_argument('--from-file', help="file listing one directory or glob pattern per line")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument('--per-device', type=positive_int, default=2, help="directories organized at once on each device")
+    parser.add_argument('--mode', choices=['folder', 'flatten', 'in_place'], default='folder',
+                        help="'folder' organizes each directory alone, the others each whole tree")
+    parser.add_argument('--workers', type=int, default=1, help="threads moving files within each directory")
+    parser.add_argument('--collisions', choices=['skip', 'rename', 'keep_newer'], default='rename',
+                        help="what to do with a file whose name is taken in its category folder")
+    parser.add_argument('--undo', action='store_true', help="undo the last organization of each directory instead")
+    parser.add_argument('--summary', default='batch-summary.json', help="consolidated summary file")
+    parser.add_argument('--max-ops', type=float, default=None, help="file operations per second, for the whole batch")
+    parser.add_argument('--max-bandwidth', type=parse_size, default=None,
+                        help="bytes copied per second across devices, for the whole batch, like 50M")
+    parser.add_argument('--target-latency', type=float, default=None,
+                        help="lower the limits while moves take longer than this many seconds")
+    parser.add_argument('--limits-file', help="JSON file with the limits, reloaded when rateLimiter.py changes it")
+    args = parser.parse_args()
+
+    patterns = list(args.directories)
+    if args.from_file:
+        with open(args.from_file) as f:
+            patterns.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    directories = expand_directories(patterns)
+    if not directories:
+        parser.error("no directory matches")
+
+    limits = None
+    if args.target_latency and not (args.max_ops or args.max_bandwidth or args.limits_file):
+        # The limits are lowered from the configured ones, there must be some
+        parser.error("--target-latency needs --max-ops, --max-bandwidth or --limits-file")
+    if args.max_ops or args.max_bandwidth or args.limits_file:
+        limits_file = os.path.abspath(args.limits_file) if args.limits_file else None
+        limits = {'ops_per_second': args.max_ops, 'bytes_per_second': args.max_bandwidth,
+                  'target_latency': args.target_latency, 'limits_file': limits_file}
+        # Limits given here replace those of the file, otherwise the file's apply
+        if limits_file and (args.max_ops or args.max_bandwidth or not os.path.exists(limits_file)):
+            save_limits(limits_file, args.max_ops, args.max_bandwidth)
+
+    batch = BatchOrganizer(args.processes, args.per_device, None if args.mode == 'folder' else args.mode,
+                           args.workers, args.collisions, on_result=print_result, limits=limits)
+    summary = batch.run(directories, undo=args.undo)
+
+    with open(args.summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+    totals = summary['totals']
+    print(f"{totals['directories']} directories, {totals['files']} files in {summary['elapsed_seconds']:.1f}s: "
+          f"{totals['ok']} ok, {totals['partial']} with errors, {totals['failed']} failed. "
+          f"Summary written to {args.summary}")
+    sys.exit(1 if totals['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
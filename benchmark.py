@@ -0,0 +1,290 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from folderOrganizer import FolderOrganizer
+from generator import TestFileGenerator
+from workloadProfile import WorkloadProfile, get_profile
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory isn't measured there
+    resource = None
+
+FORMAT_NAME = 'folder-organizer-benchmark'
+FORMAT_VERSION = 1
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+TMPFS_DIRECTORY = '/dev/shm'
+
+# Seed of the fixture names, so that results are comparable between runs
+FIXTURE_SEED = 1
+
+# Minimum number of get_category_for_name calls timed per case
+CLASSIFY_LOOKUPS = 1000000
+
+# os functions counted as filesystem calls, the Python-level wrappers of one system call each.
+# os.makedirs is left out, it calls os.mkdir for every folder it creates.
+COUNTED_CALLS = ['scandir', 'stat', 'lstat', 'rename', 'replace', 'mkdir', 'open', 'unlink',
+                 'rmdir', 'link', 'symlink', 'readlink', 'utime', 'chmod', 'copy_file_range', 'sendfile']
+
+
+class CallCounter:
+    def __init__(self, names: List[str]):
+        """
+        Count the calls made to os functions, by replacing them with counting wrappers.
+
+        Calls made from C, like DirEntry.stat() or shutil's internal calls, are not counted,
+        nor are the calls DirEntry answers from its cache.
+        """
+        self.names = [name for name in names if hasattr(os, name)]
+        self.count = 0
+        self._originals = {}
+
+    def __enter__(self) -> 'CallCounter':
+        for name in self.names:
+            original = self._originals[name] = getattr(os, name)
+
+            def counted(*args, _original=original, **kwargs):
+                self.count += 1
+                return _original(*args, **kwargs)
+
+            setattr(os, name, counted)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for name, original in self._originals.items():
+            setattr(os, name, original)
+        self._originals.clear()
+
+
+def peak_rss_kib() -> int | None:
+    """Peak resident memory of this process so far, in KiB, None where it can't be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(operation: str, location: str, files: int, function, rounds: int = 1) -> Dict:
+    """Run a benchmarked function once and describe the run, the function going over the files rounds times."""
+    with CallCounter(COUNTED_CALLS) as counter:
+        start_time = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start_time
+
+    return {
+        'operation': operation,
+        'location': location,
+        'files': files,
+        'seconds': round(seconds, 6),
+        'files_per_second': round(files * rounds / seconds, 1) if seconds else None,
+        'syscalls_per_file': round(counter.count / (files * rounds), 3) if files else None,
+        'peak_rss_kib': peak_rss_kib(),
+    }
+
+
+def run_case(directory: str, location: str, workers: int) -> List[Dict]:
+    """Benchmark organize_folder, undo_last_operation and get_category_for_name on a fixture."""
+    organizer = FolderOrganizer()
+    names = [entry.name for entry in os.scandir(directory) if entry.is_file()]
+
+    # Lookups are far faster than moves, repeat them enough to be measurable
+    rounds = max(1, CLASSIFY_LOOKUPS // max(1, len(names)))
+
+    def classify():
+        for _ in range(rounds):
+            for name in names:
+                organizer.get_category_for_name(name)
+
+    # Classification first, before the moves grow the memory use
+    results = [measure('classify', location, len(names), classify, rounds)]
+    folders = {entry.name for entry in os.scandir(directory) if entry.is_dir()}
+    results.append(measure('organize', location, len(names), lambda: organizer.organize_folder(directory, workers)))
+    results.append(measure('undo', location, len(names), lambda: organizer.undo_last_operation(workers)))
+
+    # Undo leaves the category folders behind, the next repeat has to create them again
+    for entry in os.scandir(directory):
+        if entry.is_dir() and entry.name not in folders:
+            with contextlib.suppress(OSError):
+                os.rmdir(entry.path)
+    return results
+
+
+def create_fixture(parent: str, size: int, profile: WorkloadProfile | None = None) -> str:
+    """
+    Create a directory of about size files with TestFileGenerator, the same ones on every run.
+
+    Without a profile, every extension gets the same number of empty files.
+    """
+    directory = tempfile.mkdtemp(prefix='organizer-benchmark-', dir=parent)
+    generator = TestFileGenerator()
+    with contextlib.redirect_stdout(sys.stderr):
+        if profile is not None:
+            generator.generate_workload(directory, profile, size, seed=FIXTURE_SEED)
+        else:
+            extension_count = sum(len(extensions) for extensions in generator.extension_maps.values())
+            generator.generate_test_files_fast(directory, max(1, math.ceil(size / extension_count)),
+                                               seed=FIXTURE_SEED)
+    return directory
+
+
+def locations(args) -> Dict[str, str]:
+    """Directories to benchmark in, by location name."""
+    found = {}
+    if 'tmpfs' in args.locations:
+        if os.path.isdir(TMPFS_DIRECTORY) and os.access(TMPFS_DIRECTORY, os.W_OK):
+            found['tmpfs'] = TMPFS_DIRECTORY
+        else:
+            print(f"Skipping tmpfs: {TMPFS_DIRECTORY} is not available", file=sys.stderr)
+    if 'disk' in args.locations:
+        found['disk'] = os.path.abspath(args.disk_dir or tempfile.gettempdir())
+    return found
+
+
+def run(args) -> int:
+    profile = get_profile(args.profile) if args.profile else None
+    results = []
+    for location, parent in locations(args).items():
+        for size in args.sizes:
+            print(f"Benchmarking {size} files on {location}...", file=sys.stderr)
+            directory = create_fixture(parent, size, profile)
+            try:
+                # Undo puts the files back and the case removes the folders it created, so each repeat
+                # runs on the same fixture
+                runs = {}
+                for _ in range(args.repeat):
+                    # A process per case, so peak memory is that of the case alone
+                    output = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), 'case', directory,
+                         '--location', location, '--workers', str(args.workers)],
+                        capture_output=True, text=True, check=True
+                    ).stdout
+                    for result in json.loads(output):
+                        runs.setdefault(result['operation'], []).append(result)
+
+                for operation_runs in runs.values():
+                    # The fastest run is the one least disturbed by the rest of the system
+                    result = dict(min(operation_runs, key=lambda r: r['seconds']))
+                    result['peak_rss_kib'] = max((r['peak_rss_kib'] for r in operation_runs
+                                                  if r['peak_rss_kib'] is not None), default=None)
+                    result['repeats'] = len(operation_runs)
+                    results.append(result)
+                    print(f"  {result['operation']:>8}: {result['files_per_second']} files/s, "
+                          f"{result['syscalls_per_file']} syscalls/file, {result['peak_rss_kib']} KiB peak RSS",
+                          file=sys.stderr)
+            except subprocess.CalledProcessError as e:
+                print(f"  Failed: {e.stderr.strip()}", file=sys.stderr)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': args.workers,
+        'profile': profile.to_dict() if profile is not None else None,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+def load_report(path: str) -> Dict:
+    with open(path) as f:
+        report = json.load(f)
+    if report.get('format') != FORMAT_NAME:
+        raise ValueError(f"{path} is not a benchmark result file")
+    return report
+
+
+def results_by_case(report: Dict) -> Dict[tuple, Dict]:
+    return {(result['operation'], result['location'], result['files']): result for result in report['results']}
+
+
+def compare(args) -> int:
+    """Compare results with a baseline, returning 1 if anything regressed by more than the threshold."""
+    baseline_report = load_report(args.baseline)
+    current_report = load_report(args.current)
+    if baseline_report.get('profile') != current_report.get('profile'):
+        print("The baseline and current results were measured on different workload profiles", file=sys.stderr)
+        return 2
+
+    baseline = results_by_case(baseline_report)
+    current = results_by_case(current_report)
+    regressions = 0
+
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        problems = []
+        # Throughput regresses when it drops, syscalls and memory when they grow
+        if before['files_per_second'] and after['files_per_second'] is not None:
+            change = after['files_per_second'] / before['files_per_second'] - 1
+            if change < -args.threshold:
+                problems.append(f"files/s {change:+.1%}")
+        for metric in ('syscalls_per_file', 'peak_rss_kib'):
+            if before[metric] and after[metric] is not None:
+                change = after[metric] / before[metric] - 1
+                if change > args.threshold:
+                    problems.append(f"{metric} {change:+.1%}")
+
+        operation, location, files = key
+        status = "REGRESSION " + ", ".join(problems) if problems else "ok"
+        print(f"{operation:>8} {location:>6} {files:>8} files: {status}")
+        regressions += bool(problems)
+
+    for key in sorted(baseline.keys() - current.keys()):
+        print(f"{key[0]:>8} {key[1]:>6} {key[2]:>8} files: missing from current results")
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark organizing, undoing and classifying files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="fixture sizes in files")
+    run_parser.add_argument('--locations', nargs='+', choices=['tmpfs', 'disk'], default=['tmpfs', 'disk'])
+    run_parser.add_argument('--disk-dir', help="directory on a disk to create fixtures in, the temporary directory "
+                                               "by default")
+    run_parser.add_argument('--workers', type=int, default=1, help="threads moving files")
+    run_parser.add_argument('--profile', help="workload profile of the fixtures, a preset name or a .json file")
+    run_parser.add_argument('--repeat', type=int, default=3, help="runs per case, the fastest one is kept")
+    run_parser.add_argument('--output', default='benchmark.json', help="result file")
+
+    compare_parser = commands.add_parser('compare', help="flag regressions against a baseline result file")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="relative change counted as a regression, 0.1 for 10%%")
+
+    case_parser = commands.add_parser('case', help=argparse.SUPPRESS)
+    case_parser.add_argument('directory')
+    case_parser.add_argument('--location', required=True)
+    case_parser.add_argument('--workers', type=int, default=1)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        sys.exit(run(args))
+    elif args.command == 'compare':
+        sys.exit(compare(args))
+    else:
+        print(json.dumps(run_case(args.directory, args.location, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
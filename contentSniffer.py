@@ -0,0 +1,199 @@
+import json
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+CACHE_FORMAT = 'folder-organizer-sniff-cache'
+# Bump when the signatures change, so cached results made with older ones are dropped
+SIGNATURES_VERSION = 1
+
+# Bytes read from the start of each file, enough for every signature below
+HEAD_SIZE = 4096
+
+# (offset, magic bytes, category) checked in order, the first match wins
+SIGNATURES: List[Tuple[int, bytes, str]] = [
+    (0, b'\xff\xd8\xff', 'Images'),
+    (0, b'\x89PNG\r\n\x1a\n', 'Images'),
+    (0, b'GIF87a', 'Images'),
+    (0, b'GIF89a', 'Images'),
+    (0, b'II*\x00', 'Images'),
+    (0, b'MM\x00*', 'Images'),
+    (8, b'WEBP', 'Images'),
+    (4, b'ftypheic', 'Images'),
+    (4, b'ftypavif', 'Images'),
+    (4, b'ftypM4A ', 'Audio'),
+    (4, b'ftyp', 'Videos'),
+    (0, b'\x1aE\xdf\xa3', 'Videos'),
+    (8, b'AVI ', 'Videos'),
+    (0, b'FLV\x01', 'Videos'),
+    (0, b'ID3', 'Audio'),
+    (0, b'fLaC', 'Audio'),
+    (0, b'OggS', 'Audio'),
+    (8, b'WAVE', 'Audio'),
+    (8, b'AIFF', 'Audio'),
+    (0, b'MThd', 'Audio'),
+    (0, b'%PDF-', 'Documents'),
+    (0, b'{\\rtf', 'Documents'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'Documents'),
+    (0, b'Rar!\x1a\x07', 'Archives'),
+    (0, b'7z\xbc\xaf\x27\x1c', 'Archives'),
+    (0, b'\x1f\x8b', 'Archives'),
+    (0, b'BZh', 'Archives'),
+    (0, b'\xfd7zXZ\x00', 'Archives'),
+    (257, b'ustar', 'Archives'),
+    (0, b'MZ', 'Executables'),
+    (0, b'\x7fELF', 'Executables'),
+    (0, b'\xcf\xfa\xed\xfe', 'Executables'),
+    (0, b'\xfe\xed\xfa\xcf', 'Executables'),
+    (0, b'SQLite format 3\x00', 'Databases'),
+    (0, b'OTTO', 'Fonts'),
+    (0, b'wOFF', 'Fonts'),
+    (0, b'wOF2', 'Fonts'),
+    (0, b'AT&TFORM', 'eBooks'),
+    (0, b'\x89HDF\r\n\x1a\n', 'Scientific'),
+    (0, b'SIMPLE  =', 'Scientific'),
+    (128, b'DICM', 'Medical_Imaging'),
+    (0, b'\xd4\xc3\xb2\xa1', 'Network'),
+    (0, b'\xa1\xb2\xc3\xd4', 'Network'),
+    (0, b'\x0a\x0d\x0d\x0a', 'Network'),
+    (0, b'KDMV', 'Virtual_Machines'),
+    (0, b'QFI\xfb', 'Virtual_Machines'),
+    (0, b'conectix', 'Virtual_Machines'),
+    (0, b'vhdxfile', 'Virtual_Machines'),
+    (0, b'd8:announce', 'Torrent'),
+    (0, b'-----BEGIN ', 'Security'),
+]
+
+# Text files recognized by how they start, after whitespace and a byte order mark
+TEXT_PREFIXES: List[Tuple[bytes, str]] = [
+    (b'<!doctype html', 'Web'),
+    (b'<html', 'Web'),
+    (b'<?xml', 'Web'),
+    (b'#!', 'Code'),
+]
+
+
+class ContentSniffer:
+    def __init__(self, cache_path: str | None = None, head_size: int = HEAD_SIZE, workers: int = 8,
+                 check_known_extensions: bool = False):
+        """
+        Classify files by their first bytes, for files whose extension says nothing or can't be trusted.
+
+        Only head_size bytes are read from each file, with a single read. Results are cached by
+        (device, inode, size, mtime), in cache_path when given, so unchanged files are never read twice.
+
+        Args:
+            cache_path (str | None): JSON file keeping results between runs, None keeps them in memory only
+            head_size (int): Number of bytes read from the start of each file
+            workers (int): Number of threads reading files in classify_many
+            check_known_extensions (bool): Also read files whose extension maps to a single category, to catch
+                                           mislabeled files, at the cost of reading every file once
+        """
+        self.cache_path = cache_path
+        self.head_size = head_size
+        self.workers = workers
+        self.check_known_extensions = check_known_extensions
+        # (device, inode, size, mtime_ns) -> category, '' when the content wasn't recognized
+        self.cache: Dict[Tuple[int, int, int, int], str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if cache_path is not None:
+            self._load_cache()
+
+    def sniff(self, path: str) -> str | None:
+        """Read the start of a file and return the category its content belongs to, or None."""
+        fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # pread doesn't move the file offset, on Windows a plain read from the start does the same
+            head = os.pread(fd, self.head_size, 0) if hasattr(os, 'pread') else os.read(fd, self.head_size)
+        finally:
+            os.close(fd)
+        return self.classify_head(head)
+
+    @staticmethod
+    def classify_head(head: bytes) -> str | None:
+        """Match the first bytes of a file against the known signatures."""
+        if head.startswith(b'PK\x03\x04'):
+            # Office documents, eBooks and Android packages are zip files too, tell them apart by their first entries
+            if b'[Content_Types].xml' in head or b'mimetypeapplication/vnd.oasis' in head:
+                return 'Documents'
+            if b'mimetypeapplication/epub+zip' in head:
+                return 'eBooks'
+            if b'AndroidManifest.xml' in head:
+                return 'Executables'
+            return 'Archives'
+
+        for offset, magic, category in SIGNATURES:
+            if head.startswith(magic, offset):
+                return category
+
+        text = head[:64].lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+        for prefix, category in TEXT_PREFIXES:
+            if text.startswith(prefix):
+                return category
+        return None
+
+    def classify(self, path: str) -> str | None:
+        """Get the category of a file's content, from the cache when the file hasn't changed."""
+        try:
+            file_stat = os.lstat(path)
+            # Links are moved as links, what they point to doesn't matter
+            if not stat.S_ISREG(file_stat.st_mode):
+                return None
+
+            key = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached or None
+
+            category = self.sniff(path)
+        except OSError:
+            # An unreadable file is classified by its extension alone
+            return None
+
+        with self._lock:
+            self.cache[key] = category or ''
+            self._dirty = True
+        return category
+
+    def classify_many(self, paths: List[str]) -> List[str | None]:
+        """Classify several files on a thread pool, returning their categories in order."""
+        if self.workers <= 1 or len(paths) <= 1:
+            return [self.classify(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(self.classify, paths))
+
+    def _load_cache(self) -> None:
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # No cache yet, or a damaged one: start over
+            return
+
+        if data.get('format') != CACHE_FORMAT or data.get('signatures') != SIGNATURES_VERSION:
+            return
+        for key, category in data.get('entries', {}).items():
+            self.cache[tuple(int(part) for part in key.split(':'))] = category
+
+    def save(self) -> None:
+        """Write the cache to cache_path if it changed, replacing the file atomically."""
+        if self.cache_path is None or not self._dirty:
+            return
+
+        with self._lock:
+            data = {
+                'format': CACHE_FORMAT,
+                'signatures': SIGNATURES_VERSION,
+                'entries': {':'.join(map(str, key)): category for key, category in self.cache.items()},
+            }
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temporary_path = self.cache_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temporary_path, self.cache_path)
@@ -0,0 +1,87 @@
+import errno
+import os
+import threading
+import time
+from typing import Dict
+
+COLLISION_POLICIES = ('skip', 'rename', 'keep_newer')
+
+
+class DestinationIndex:
+    def __init__(self):
+        """
+        Names in the category folders of an operation, listed once per folder instead of a stat per file.
+
+        A folder is listed with a single scandir the first time a file goes into it, or created empty.
+        Names are then claimed in memory, so concurrent workers never pick the same one. Names are
+        compared with os.path.normcase, case-insensitively on Windows.
+        """
+        self._folders: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        # Held while a file swaps places with an older one of the same name
+        self.swap_lock = threading.Lock()
+        # Folders listed and created, and the seconds spent on it, for the organizer's stats
+        self.listed = 0
+        self.created = 0
+        self.seconds = 0.0
+
+    def __contains__(self, folder: str) -> bool:
+        return folder in self._folders
+
+    def add_folder(self, folder: str) -> None:
+        """List a category folder, creating it if it doesn't exist."""
+        start_time = time.perf_counter()
+        created = False
+        try:
+            with os.scandir(folder) as scanner:
+                names = {os.path.normcase(entry.name) for entry in scanner}
+        except FileNotFoundError:
+            try:
+                os.makedirs(folder, exist_ok=True)
+            except FileExistsError:
+                raise FileExistsError(errno.EEXIST, "A file is in the way of the category folder", folder)
+            names = set()
+            created = True
+        except NotADirectoryError:
+            raise FileExistsError(errno.EEXIST, "A file is in the way of the category folder", folder)
+
+        with self._lock:
+            self.listed += 1
+            self.created += created
+            self.seconds += time.perf_counter() - start_time
+            # Another worker may have listed it meanwhile, its claims must be kept
+            existing = self._folders.setdefault(folder, names)
+            if existing is not names:
+                existing |= names
+
+    def claim(self, folder: str, name: str) -> bool:
+        """Take a name in a folder, returning False if it is already taken."""
+        key = os.path.normcase(name)
+        with self._lock:
+            names = self._folders[folder]
+            if key in names:
+                return False
+            names.add(key)
+            return True
+
+    def claim_free_name(self, folder: str, name: str) -> str:
+        """Take the first free name of the form 'name (n).ext' in a folder and return it."""
+        stem, extension = os.path.splitext(name)
+        with self._lock:
+            names = self._folders[folder]
+            number = 1
+            while os.path.normcase(f"{stem} ({number}){extension}") in names:
+                number += 1
+            free_name = f"{stem} ({number}){extension}"
+            names.add(os.path.normcase(free_name))
+            return free_name
+
+    def release(self, folder: str, name: str) -> None:
+        """Give back a claimed name, when nothing was moved to it after all."""
+        with self._lock:
+            self._folders[folder].discard(os.path.normcase(name))
+
+    def forget(self, folder: str) -> None:
+        """Drop a folder that was removed, it is listed again if a file goes into it."""
+        with self._lock:
+            self._folders.pop(folder, None)
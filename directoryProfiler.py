@@ -0,0 +1,265 @@
+import argparse
+import errno
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from folderOrganizer import FolderOrganizer
+
+PROFILE_FORMAT = 'folder-organizer-profile'
+PROFILE_VERSION = 1
+
+# Size histograms have a bucket per power of two, bucket k counting sizes of k bits
+HISTOGRAM_BUCKETS = 64
+# Errors kept with their message in a report, the others are only counted
+MAX_ERROR_SAMPLES = 100
+
+
+class DirectoryProfile:
+    def __init__(self, directory: str = '', mode: str | None = None):
+        """
+        Number of files and bytes going to each category, and to each extension, aggregated while walking.
+
+        Nothing is kept per file, so memory depends on the number of categories and extensions only.
+        Profiles of parts of a tree are combined with merge.
+        """
+        self.directory = directory
+        self.mode = mode
+        self.directories = 0
+        self.files = 0
+        self.bytes = 0
+        # Category -> [files, bytes, size histogram]
+        self.categories: Dict[str, list] = {}
+        # Extension -> [files, bytes, category]
+        self.extensions: Dict[str, list] = {}
+        self.errors = 0
+        self.error_samples: List[Tuple[str, str]] = []
+        self.elapsed = 0.0
+
+    def add(self, category: str, file_extension: str, size: int) -> None:
+        """Count a file."""
+        self.files += 1
+        self.bytes += size
+        totals = self.categories.get(category)
+        if totals is None:
+            totals = self.categories[category] = [0, 0, [0] * HISTOGRAM_BUCKETS]
+        totals[0] += 1
+        totals[1] += size
+        totals[2][size.bit_length()] += 1
+
+        extension_totals = self.extensions.get(file_extension)
+        if extension_totals is None:
+            extension_totals = self.extensions[file_extension] = [0, 0, category]
+        extension_totals[0] += 1
+        extension_totals[1] += size
+
+    def add_error(self, path: str, message: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < MAX_ERROR_SAMPLES:
+            self.error_samples.append((path, message))
+
+    def merge(self, other: 'DirectoryProfile') -> None:
+        """Add the counts of another profile to this one."""
+        self.directories += other.directories
+        self.files += other.files
+        self.bytes += other.bytes
+        for category, (files, size, histogram) in other.categories.items():
+            totals = self.categories.setdefault(category, [0, 0, [0] * HISTOGRAM_BUCKETS])
+            totals[0] += files
+            totals[1] += size
+            totals[2] = [count + other_count for count, other_count in zip(totals[2], histogram)]
+        for file_extension, (files, size, category) in other.extensions.items():
+            totals = self.extensions.setdefault(file_extension, [0, 0, category])
+            totals[0] += files
+            totals[1] += size
+        self.errors += other.errors
+        self.error_samples.extend(other.error_samples[:MAX_ERROR_SAMPLES - len(self.error_samples)])
+
+    def unmapped_extensions(self) -> List[Tuple[str, int, int]]:
+        """Get the (extension, files, bytes) of the extensions going to Others, the most common first."""
+        unmapped = [(file_extension, files, size) for file_extension, (files, size, category) in self.extensions.items()
+                    if category == 'Others' and file_extension]
+        return sorted(unmapped, key=lambda item: (-item[1], -item[2], item[0]))
+
+    @staticmethod
+    def _histogram_dict(histogram: List[int]) -> Dict[str, int]:
+        """Label the non-empty buckets of a size histogram with the smallest size they count."""
+        return {str(1 << (bits - 1) if bits else 0): count for bits, count in enumerate(histogram) if count}
+
+    def to_dict(self) -> Dict:
+        categories = sorted(self.categories.items(), key=lambda item: (-item[1][0], item[0]))
+        extensions = sorted(self.extensions.items(), key=lambda item: (-item[1][0], item[0]))
+        return {
+            'format': PROFILE_FORMAT,
+            'version': PROFILE_VERSION,
+            'directory': self.directory,
+            'mode': self.mode,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'directories': self.directories,
+            'files': self.files,
+            'bytes': self.bytes,
+            'categories': {category: {'files': files, 'bytes': size, 'size_histogram': self._histogram_dict(histogram)}
+                           for category, (files, size, histogram) in categories},
+            'extensions': {file_extension: {'files': files, 'bytes': size, 'category': category}
+                           for file_extension, (files, size, category) in extensions},
+            'unmapped_extensions': [{'extension': file_extension, 'files': files, 'bytes': size}
+                                    for file_extension, files, size in self.unmapped_extensions()],
+            'errors': self.errors,
+            'error_samples': [{'path': path, 'message': message} for path, message in self.error_samples],
+        }
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class DirectoryProfiler:
+    def __init__(self, organizer: FolderOrganizer | None = None, workers: int = 16, with_sizes: bool = True):
+        """
+        Report how many files and bytes an organization would send to each category, without changing anything.
+
+        The tree is walked by a pool of threads, each listing whole directories with scandir and queueing the
+        subdirectories it finds, so slow or remote storage is listed concurrently. Each thread aggregates into
+        a profile of its own, merged at the end. Files are classified by name with the organizer's rules.
+
+        Args:
+            organizer (FolderOrganizer | None): Organizer whose classification is profiled, a default one if None
+            workers (int): Number of threads listing directories
+            with_sizes (bool): Count bytes, which costs a stat per file on POSIX
+        """
+        self.organizer = FolderOrganizer() if organizer is None else organizer
+        self.workers = workers
+        self.with_sizes = with_sizes
+
+    def profile(self, directory: str, mode: str | None = 'flatten',
+                cancel_event: threading.Event | None = None) -> DirectoryProfile:
+        """
+        Profile a directory the way it would be organized.
+
+        Args:
+            directory (str): The directory to profile
+            mode (str | None): None for the directory alone like organize_folder, 'flatten' or 'in_place' for
+                               the whole tree like organize_tree, skipping the same category folders
+            cancel_event (threading.Event | None): Set from another thread to stop listing new directories,
+                                                   the profile then covers the directories listed so far
+        """
+        if mode not in (None, 'flatten', 'in_place'):
+            raise ValueError(f"Unknown tree organization mode: {mode}")
+        root = os.path.abspath(directory)
+        if not os.path.isdir(root):
+            raise NotADirectoryError(errno.ENOTDIR, "Not a directory", root)
+
+        start_time = time.perf_counter()
+        category_names = set(self.organizer.extension_maps) | {'Others'}
+        pending: queue.Queue = queue.Queue()
+        pending.put(root)
+        profiles = [DirectoryProfile() for _ in range(max(1, self.workers))]
+
+        def work(profile: DirectoryProfile) -> None:
+            while True:
+                folder = pending.get()
+                try:
+                    if folder is None:
+                        return
+                    if cancel_event is None or not cancel_event.is_set():
+                        self._scan_folder(folder, root, mode, category_names, profile, pending)
+                finally:
+                    pending.task_done()
+
+        with ThreadPoolExecutor(max_workers=len(profiles)) as executor:
+            futures = [executor.submit(work, profile) for profile in profiles]
+            # Every listed directory is done, including the subdirectories found on the way
+            pending.join()
+            for _ in profiles:
+                pending.put(None)
+        for future in futures:
+            future.result()
+
+        result = DirectoryProfile(root, mode)
+        for profile in profiles:
+            result.merge(profile)
+        result.elapsed = time.perf_counter() - start_time
+        return result
+
+    def _scan_folder(self, folder: str, root: str, mode: str | None, category_names: set,
+                     profile: DirectoryProfile, pending: queue.Queue) -> None:
+        """Count the files of a directory and queue its subdirectories."""
+        try:
+            with os.scandir(folder) as scanner:
+                profile.directories += 1
+                for entry in scanner:
+                    # Hidden entries are never organized
+                    if entry.name.startswith('.'):
+                        continue
+
+                    if entry.is_dir():
+                        # Skip what the organizer skips: symlinked directories and category folders
+                        if mode is None or entry.is_symlink() or (entry.name in category_names
+                                                                  and (mode == 'in_place' or folder == root)):
+                            continue
+                        pending.put(entry.path)
+                        continue
+
+                    category, file_extension = self.organizer._classify_name(entry.name)
+                    if file_extension is None:
+                        # Classified by a name rule, counted under its plain extension
+                        file_extension = os.path.splitext(entry.name)[1].lower()
+                    size = entry.stat(follow_symlinks=False).st_size if self.with_sizes else 0
+                    profile.add(category, file_extension, size)
+        except OSError as e:
+            profile.add_error(folder, str(e))
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes for humans, like '1.5 GiB'."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if size < 1024 or unit == 'TiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_profile(profile: DirectoryProfile, top_unmapped: int = 20) -> None:
+    print(f"{profile.files} files, {format_size(profile.bytes)} in {profile.directories} directories "
+          f"({profile.elapsed:.1f}s)")
+    print(f"\n{'Category':<20} {'Files':>10} {'Size':>12}")
+    for category, (files, size, _) in sorted(profile.categories.items(), key=lambda item: -item[1][0]):
+        print(f"{category:<20} {files:>10} {format_size(size):>12}")
+
+    unmapped = profile.unmapped_extensions()
+    if unmapped:
+        print("\nMost common unmapped extensions:")
+        for file_extension, files, size in unmapped[:top_unmapped]:
+            print(f"{file_extension:<20} {files:>10} {format_size(size):>12}")
+    if profile.errors:
+        print(f"\n{profile.errors} directories could not be listed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report what organizing a directory would do, without changing it.")
+    parser.add_argument('directory')
+    parser.add_argument('--mode', choices=['folder', 'flatten', 'in_place'], default='flatten',
+                        help="'folder' profiles the directory alone, the others the whole tree")
+    parser.add_argument('--workers', type=int, default=16, help="threads listing directories")
+    parser.add_argument('--no-sizes', action='store_true', help="don't count bytes, saving a stat per file")
+    parser.add_argument('--output', help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    profiler = DirectoryProfiler(workers=args.workers, with_sizes=not args.no_sizes)
+    try:
+        profile = profiler.profile(args.directory, None if args.mode == 'folder' else args.mode)
+    except OSError as e:
+        print(f"Cannot profile {args.directory}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_profile(profile)
+    if args.output:
+        profile.save(args.output)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
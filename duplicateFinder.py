@@ -0,0 +1,147 @@
+import hashlib
+import os
+import stat
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Bytes hashed from each end of a file before deciding to read all of it
+PARTIAL_SIZE = 64 * 1024
+# Bytes read at a time when hashing or comparing whole files
+READ_SIZE = 1024 * 1024
+
+POLICIES = ('skip', 'hardlink', 'category')
+DUPLICATES_CATEGORY = 'Duplicates'
+
+
+class DuplicateFinder:
+    def __init__(self, policy: str = 'category', workers: int = 8, partial_size: int = PARTIAL_SIZE,
+                 min_size: int = 1):
+        """
+        Find files with the same content, reading as little of them as possible.
+
+        Files are grouped by size first, which costs nothing as the plan already has the sizes. Files
+        sharing a size are told apart by a hash of their first and last partial_size bytes, and only those
+        still matching are hashed in full. Hashing runs on a thread pool.
+
+        Args:
+            policy (str): What organizing does with the copies: 'skip' leaves them where they are,
+                          'hardlink' replaces them with hard links to the kept file once moved,
+                          'category' moves them to the Duplicates category
+            workers (int): Number of threads reading files
+            partial_size (int): Bytes hashed at each end of a file in the partial pass
+            min_size (int): Smaller files are never considered duplicates, 1 leaves out empty files
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {policy}, expected one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.workers = workers
+        self.partial_size = partial_size
+        self.min_size = min_size
+        # Files read by the last find, to see how much the cheap passes saved
+        self.partial_hashed = 0
+        self.fully_hashed = 0
+
+    @staticmethod
+    def keep_order(path: str) -> Tuple[int, str]:
+        """Sort key choosing the copy to keep: the shortest name, then the first in lexicographic order."""
+        name = os.path.basename(path)
+        return len(name), name
+
+    def find(self, files: Iterable[Tuple[str, int]]) -> List[List[str]]:
+        """
+        Group the given (path, size) files by content.
+
+        Returns the groups of two or more identical files, each sorted by keep_order so that the copy
+        to keep comes first. Files that can't be read are left out.
+        """
+        by_size: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        for path, size in files:
+            if size >= self.min_size:
+                by_size[size].append((path, size))
+        groups = [group for group in by_size.values() if len(group) > 1]
+
+        self.partial_hashed = sum(len(group) for group in groups)
+        groups = self._refine(groups, self.partial_hash)
+
+        # A partial hash of a small file already covers all of it
+        complete = [group for group in groups if group[0][1] <= 2 * self.partial_size]
+        to_hash = [group for group in groups if group[0][1] > 2 * self.partial_size]
+        self.fully_hashed = sum(len(group) for group in to_hash)
+        groups = complete + self._refine(to_hash, self.full_hash)
+
+        return sorted((sorted((path for path, _ in group), key=self.keep_order) for group in groups),
+                      key=lambda group: self.keep_order(group[0]))
+
+    def _refine(self, groups: List[List[Tuple[str, int]]],
+                key_function: Callable[[str, int], bytes | None]) -> List[List[Tuple[str, int]]]:
+        """Split groups by a key computed for each file in parallel, dropping the files left alone."""
+        files = [file for group in groups for file in group]
+        if self.workers > 1 and len(files) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                keys = list(executor.map(lambda file: key_function(*file), files))
+        else:
+            keys = [key_function(*file) for file in files]
+
+        refined: List[List[Tuple[str, int]]] = []
+        position = 0
+        for group in groups:
+            by_key: Dict[bytes, List[Tuple[str, int]]] = defaultdict(list)
+            for file, key in zip(group, keys[position:position + len(group)]):
+                if key is not None:
+                    by_key[key].append(file)
+            position += len(group)
+            refined.extend(same for same in by_key.values() if len(same) > 1)
+        return refined
+
+    def partial_hash(self, path: str, size: int) -> bytes | None:
+        """Hash the first and last partial_size bytes of a file, all of it when it's small. None if unreadable."""
+        try:
+            # Links are moved as links, they are not copies of what they point to
+            if not stat.S_ISREG(os.lstat(path).st_mode):
+                return None
+            fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                if size <= 2 * self.partial_size:
+                    data = _read_at(fd, size, 0)
+                else:
+                    data = (_read_at(fd, self.partial_size, 0)
+                            + _read_at(fd, self.partial_size, size - self.partial_size))
+            finally:
+                os.close(fd)
+        except OSError:
+            return None
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    @staticmethod
+    def full_hash(path: str, size: int = -1) -> bytes | None:
+        """Hash the whole content of a file. None if unreadable."""
+        digest = hashlib.blake2b()
+        try:
+            with open(path, 'rb') as f:
+                while chunk := f.read(READ_SIZE):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.digest()
+
+    @staticmethod
+    def same_content(path: str, other_path: str) -> bool:
+        """Compare two files byte by byte, stopping at the first difference."""
+        with open(path, 'rb') as f, open(other_path, 'rb') as other:
+            if os.fstat(f.fileno()).st_size != os.fstat(other.fileno()).st_size:
+                return False
+            while True:
+                chunk = f.read(READ_SIZE)
+                if chunk != other.read(READ_SIZE):
+                    return False
+                if not chunk:
+                    return True
+
+
+def _read_at(fd: int, size: int, offset: int) -> bytes:
+    """Read size bytes at an offset, without sharing a file offset between threads where pread exists."""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
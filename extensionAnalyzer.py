@@ -1,6 +1,12 @@
-from typing import Dict, List
-from collections import defaultdict
+import math
+import os
+import random
+import time
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+from collections import Counter, defaultdict
 from extensionMaps import EXTENSION_MAPS
+from ruleEngine import RuleEngine
 
 
 class ExtensionAnalyzer:
@@ -74,6 +80,179 @@ class ExtensionAnalyzer:
             if extension in extensions
         ]
 
+    def estimate_tree(self, directory: str, time_budget: float = 5.0, max_entries: int = 200000,
+                      seed: int | None = None, confidence: float = 0.95) -> Dict:
+        """
+        Estimate the category mix and the unmapped extensions of a directory tree too big to list, by sampling.
+
+        Random walks go down from the root to a directory without subdirectories, picking a subdirectory
+        at random at each level. The files of each directory on the way count as many times as there are
+        directories like it at its level, the product of the numbers of subdirectories on the way, which
+        makes every walk an unbiased estimate of the whole tree. Shares are ratios of these estimates,
+        with confidence intervals from the spread between walks.
+
+        Walks go on until the time or entry budget runs out, checked between walks so that no walk is
+        cut short. A listing stops when the budget runs out though, so that a huge flat directory is never
+        read whole: the files it has past that point are missed, the number of files is then a lower bound,
+        and 'truncated' counts such directories. Directory listings are reused between walks, and once
+        every directory has been listed the exact counts are returned instead, with 'exhaustive' set.
+
+        Args:
+            directory (str): Root of the tree
+            time_budget (float): Seconds to spend sampling
+            max_entries (int): Maximum number of directory entries to read
+            seed (int | None): Seed of the random walks, for repeatable estimates
+            confidence (float): Confidence level of the intervals
+
+        Returns a dictionary with the estimated number of files, the share of each category, the share of files
+        with an unmapped extension and the unmapped extensions ranked by how many files they would take out of
+        Others, each with a (low, high) confidence interval.
+        """
+        engine = RuleEngine(self.extension_maps)
+        rng = random.Random(seed)
+        root = os.path.abspath(directory)
+        # Path -> (files, files per category, files per unmapped extension, subdirectories)
+        listings: Dict[str, Tuple[int, Counter, Counter, List[str]]] = {}
+        entries_read = 0
+        # Directories found but not listed yet, none left means the whole tree is known
+        unlisted = 1
+        # Directories whose listing was stopped by the budget
+        truncated = 0
+        deadline = time.monotonic() + time_budget
+
+        def listing(path: str) -> Tuple[int, Counter, Counter, List[str]]:
+            nonlocal entries_read, unlisted, truncated
+            cached = listings.get(path)
+            if cached is not None:
+                return cached
+            files, categories, unmapped, subdirectories = 0, Counter(), Counter(), []
+            read = 0
+            try:
+                with os.scandir(path) as scanner:
+                    for entry in scanner:
+                        # The clock is read every 1024 entries only
+                        if entries_read >= max_entries or (read and not read % 1024
+                                                           and time.monotonic() >= deadline):
+                            truncated += 1
+                            break
+                        read += 1
+                        entries_read += 1
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirectories.append(entry.path)
+                            continue
+                        files += 1
+                        file_extension, category = engine.split_extension(entry.name)
+                        categories[category or 'Others'] += 1
+                        if category is None and file_extension:
+                            unmapped[file_extension] += 1
+            except OSError:
+                # An unreadable directory counts as an empty one
+                pass
+            listings[path] = files, categories, unmapped, subdirectories
+            unlisted += len(subdirectories) - 1
+            return listings[path]
+
+        # Per walk: weighted total of files, of files per category and per unmapped extension
+        walks: List[Tuple[float, Counter, Counter]] = []
+        walk_count = 0
+        while not walks or (time.monotonic() < deadline and entries_read < max_entries):
+            weight, total, categories, unmapped = 1, 0.0, Counter(), Counter()
+            path = root
+            while True:
+                files, folder_categories, folder_unmapped, subdirectories = listing(path)
+                total += weight * files
+                for category, count in folder_categories.items():
+                    categories[category] += weight * count
+                for file_extension, count in folder_unmapped.items():
+                    unmapped[file_extension] += weight * count
+                if not subdirectories:
+                    break
+                weight *= len(subdirectories)
+                path = rng.choice(subdirectories)
+            walks.append((total, categories, unmapped))
+            walk_count += 1
+            if not unlisted:
+                break
+
+        exhaustive = not unlisted and not truncated
+        if exhaustive:
+            # Small enough to be listed whole: the exact counts replace the estimates
+            walks = [(sum(folder[0] for folder in listings.values()),
+                      sum((folder[1] for folder in listings.values()), Counter()),
+                      sum((folder[2] for folder in listings.values()), Counter()))]
+
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        totals = [walk[0] for walk in walks]
+        estimated_files = sum(totals) / len(totals)
+
+        def share(values: List[float]) -> Dict:
+            estimate = self._ratio_estimate(values, totals, estimated_files, z)
+            if exhaustive:
+                estimate['low'] = estimate['high'] = estimate['share']
+            return estimate
+
+        category_names = set().union(*(walk[1] for walk in walks))
+        unmapped_extensions = set().union(*(walk[2] for walk in walks))
+        unmapped_share = share([sum(walk[2].values()) for walk in walks])
+        ranked = sorted(((file_extension, share([walk[2][file_extension] for walk in walks]))
+                         for file_extension in unmapped_extensions), key=lambda item: -item[1]['share'])
+
+        files_estimate = self._mean_estimate(totals, z)
+        if exhaustive:
+            files_estimate['low'] = files_estimate['high'] = files_estimate['estimate']
+
+        return {
+            'directory': root,
+            'exhaustive': exhaustive,
+            'walks': walk_count,
+            'entries_read': entries_read,
+            'directories_listed': len(listings),
+            'truncated': truncated,
+            'confidence': confidence,
+            'estimated_files': files_estimate,
+            'categories': dict(sorted(((category, share([walk[1][category] for walk in walks]))
+                                       for category in category_names), key=lambda item: -item[1]['share'])),
+            'unmapped': unmapped_share,
+            'unmapped_extensions': [{'extension': file_extension, **estimate} for file_extension, estimate in ranked],
+        }
+
+    @staticmethod
+    def _mean_estimate(values: List[float], z: float) -> Dict:
+        """Mean of per-walk estimates with its confidence interval, None bounds with fewer than two walks."""
+        n = len(values)
+        mean = sum(values) / n
+        if n < 2:
+            return {'estimate': mean, 'low': None, 'high': None}
+        standard_error = math.sqrt(sum((value - mean) ** 2 for value in values) / (n - 1) / n)
+        return {'estimate': mean, 'low': max(0.0, mean - z * standard_error), 'high': mean + z * standard_error}
+
+    @staticmethod
+    def _ratio_estimate(values: List[float], totals: List[float], mean_total: float, z: float) -> Dict:
+        """
+        Share sum(values) / sum(totals) of per-walk estimates, with a confidence interval by linearization.
+        """
+        n = len(values)
+        total = sum(totals)
+        ratio = sum(values) / total if total else 0.0
+        estimate = {'share': ratio, 'low': None, 'high': None, 'estimated_files': ratio * mean_total}
+        if n >= 2 and mean_total:
+            variance = sum((value - ratio * walk_total) ** 2
+                           for value, walk_total in zip(values, totals)) / (n * (n - 1) * mean_total ** 2)
+            margin = z * math.sqrt(variance)
+            estimate['low'] = max(0.0, ratio - margin)
+            estimate['high'] = min(1.0, ratio + margin)
+        return estimate
+
+
+def _format_share(estimate: Dict) -> str:
+    """Format a share estimate as a percentage with its confidence interval."""
+    if estimate['low'] is None:
+        return f"{estimate['share']:>8.2%}"
+    return f"{estimate['share']:>8.2%} {estimate['low']:>8.2%}-{estimate['high']:.2%}"
+
 
 def main():
     # Initiate analyzer
@@ -85,9 +264,10 @@ def main():
         print("2. Get extension count with multiple occurrences")
         print("3. Get category statistics")
         print("4. Search for specific extension")
-        print("5. Exit")
+        print("5. Estimate the category mix of a directory tree")
+        print("6. Exit")
 
-        choice = input("\nEnter your choice (1-5): ").strip()
+        choice = input("\nEnter your choice (1-6): ").strip()
 
         if choice == '1':
             duplicates = analyzer.find_duplicates()
@@ -129,6 +309,32 @@ def main():
                 print(f"\nExtension '{ext}' not found in any category.")
 
         elif choice == '5':
+            directory = input("\nEnter the directory path to sample: ").strip()
+            if not os.path.isdir(directory):
+                print("\nInvalid directory path.")
+                continue
+            budget = input("Seconds to spend sampling (default 5): ").strip()
+            result = analyzer.estimate_tree(directory, time_budget=float(budget) if budget else 5.0)
+
+            files = result['estimated_files']
+            if result['exhaustive']:
+                print(f"\nThe whole tree was listed: {files['estimate']:.0f} files")
+            else:
+                print(f"\nEstimated from {result['walks']} random walks ({result['entries_read']} entries read): "
+                      f"{files['estimate']:.0f} files")
+            if result['truncated']:
+                print(f"{result['truncated']} directories were too big to list whole, "
+                      f"there are more files than estimated")
+            print(f"{'Category':<20} {'Share':>8} {'Interval':>18}")
+            for category, estimate in result['categories'].items():
+                print(f"{category:<20} {_format_share(estimate)}")
+
+            print(f"\nUnmapped extensions: {_format_share(result['unmapped'])}")
+            print("Extensions that would most reduce Others:")
+            for estimate in result['unmapped_extensions'][:10]:
+                print(f"{estimate['extension']:<20} {_format_share(estimate)}")
+
+        elif choice == '6':
             print("\nGoodbye!")
             break
 
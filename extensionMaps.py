@@ -65,7 +65,9 @@ EXTENSION_MAPS: Dict[str, List[str]] = {
         '.pkg', '.deb', '.rpm',
         # Additional formats
         '.arc', '.arj', '.cab', '.lzh', '.lha',
-        '.z', '.ace', '.uue', '.zoo', '.pea'
+        '.z', '.ace', '.uue', '.zoo', '.pea',
+        # Compressed tarballs
+        '.tar.gz', '.tar.bz2', '.tar.xz', '.tar.zst', '.tar.lz4'
     ],
 
     'Code': [
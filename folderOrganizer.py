@@ -1,74 +1,410 @@
+import errno
+import functools
 import os
-import shutil
-from typing import Dict, List, Tuple
+import queue
+import stat
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, KeysView, List, Sequence, Sized, Tuple
+from contentSniffer import ContentSniffer
+from destinationIndex import COLLISION_POLICIES, DestinationIndex
+from duplicateFinder import DUPLICATES_CATEGORY, DuplicateFinder
 from extensionMaps import EXTENSION_MAPS
+from moveEngine import MoveEngine
+from moveHistory import MoveHistory
+from moveJournal import JournalHistory, MoveJournal
+from organizePlan import OrganizePlan
+from organizerEvents import (EventSink, FileClassified, FileMoved, OperationError, OrganizerEvent, PhaseFinished,
+                             ScanStarted, print_event)
+from organizerStats import OrganizerStats, profiled
+from ruleEngine import NameRule, RuleEngine
+
+
+class _MoveDeferred(Exception):
+    """
+    A file that must wait for the other files of the operation, left for the sequential pass that follows:
+    a keep_newer swap met by a parallel pass, or a file whose category folder is blocked by a file of that name.
+    """
+
+
+def instrumented(operation: str):
+    """
+    Collect the stats of a run of the decorated method in last_stats, and profile it, when enabled.
+    A run started by another one, like execute_plan by organize_folder, adds to the stats of the outer run.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._stats is not None or (not self.collect_stats and self.profile_path is None):
+                return method(self, *args, **kwargs)
+
+            # The profile is of a single run
+            profile_path, self.profile_path = self.profile_path, None
+            stats = OrganizerStats(operation) if self.collect_stats else None
+            self._stats = stats
+            start_time = time.perf_counter()
+            try:
+                with profiled(profile_path) if profile_path is not None else nullcontext():
+                    return method(self, *args, **kwargs)
+            finally:
+                self._stats = None
+                if stats is not None:
+                    stats.elapsed = time.perf_counter() - start_time
+                    self.last_stats = stats
+        return wrapper
+    return decorate
 
 
 class FolderOrganizer:
-    def __init__(self, extension_maps: Dict[str, List[str]] | None = None):
+    def __init__(self, extension_maps: Dict[str, List[str]] | None = None, move_engine: MoveEngine | None = None,
+                 journal: MoveJournal | None = None, event_sink: EventSink | None = None,
+                 content_sniffer: ContentSniffer | None = None, duplicate_finder: DuplicateFinder | None = None,
+                 collision_policy: str = 'rename', rules: Iterable[NameRule] = (), collect_stats: bool = False):
         # Dictionary of file categories and their extensions
         self.extension_maps: Dict[
             str, List[str]] = self.get_default_extension_maps() if extension_maps is None else extension_maps
 
+        # Classifier compiled from extension_maps and the name rules, see RuleEngine
+        self.rule_engine = RuleEngine(rules=rules)
+        self._rebuild_extension_index()
+
+        # Engine performing the file moves, renames first and streams copies across devices
+        self.move_engine: MoveEngine = MoveEngine() if move_engine is None else move_engine
+
         # List to track moves for undo functionality
-        self.move_histories: List[List[tuple]] = []
+        self.move_histories: List[MoveHistory | JournalHistory] = []
+
+        # Optional observer receiving progress events, nothing is reported without one
+        self.event_sink: EventSink | None = event_sink
+
+        # Optional classifier reading the content of files with no, unknown or ambiguous extensions
+        self.content_sniffer: ContentSniffer | None = content_sniffer
+
+        # What happens to a file whose name is taken in its category folder: 'skip', 'rename' or 'keep_newer'
+        if collision_policy not in COLLISION_POLICIES:
+            raise ValueError(f"Unknown collision policy: {collision_policy}, "
+                             f"expected one of {', '.join(COLLISION_POLICIES)}")
+        self.collision_policy = collision_policy
+
+        # Optional finder of identical files, handled by its policy instead of being moved like the others
+        self.duplicate_finder: DuplicateFinder | None = duplicate_finder
+
+        # Stats of the last organize or undo run, kept only when collect_stats is set, see OrganizerStats.
+        # Without it the runs only check that no stats are being collected.
+        self.collect_stats = collect_stats
+        self.last_stats: OrganizerStats | None = None
+        self._stats: OrganizerStats | None = None
+        # cProfile output of the next run when set, reset once that run is done
+        self.profile_path: str | None = None
+
+        # Optional journal persisting the move histories, so undo survives restarts
+        self.journal: MoveJournal | None = None
+        if journal is not None:
+            self.use_journal(journal)
+
+    def emit(self, event: OrganizerEvent) -> None:
+        """Report an event to the event sink, if there is one."""
+        if self.event_sink is not None:
+            self.event_sink(event)
+        if self._stats is not None:
+            self._stats.record_event(event)
+
+    def _phase(self, phase: str):
+        """Context adding the wall time of a block to a phase of the stats being collected, if any."""
+        return nullcontext() if self._stats is None else self._stats.phase(phase)
+
+    def _count(self, syscall: str, calls: int = 1) -> None:
+        if self._stats is not None:
+            self._stats.count(syscall, calls)
+
+    def _count_index(self, index: DestinationIndex) -> None:
+        """Add the category folders listed and created during a run to the stats being collected, if any."""
+        if self._stats is not None:
+            self._stats.count('scandir', index.listed)
+            self._stats.count('mkdir', index.created)
+            self._stats.add_thread_time('folders', index.seconds)
 
     @staticmethod
     def get_default_extension_maps() -> Dict[str, List[str]]:
         return EXTENSION_MAPS.copy()
 
+    def _rebuild_extension_index(self) -> None:
+        """Compile the extension maps into the rule engine's extension lookup.
+
+        Categories are visited in map order and existing entries are never overwritten,
+        so an extension listed in several categories keeps resolving to the first one.
+        """
+        self.rule_engine.compile_extensions(self.extension_maps)
+
+    def set_rules(self, rules: Iterable[NameRule]) -> None:
+        """Replace the name rules, checked in order before the extensions."""
+        self.rule_engine.set_rules(rules)
+
+    def get_rules(self) -> List[NameRule]:
+        """Get a copy of the name rules."""
+        return list(self.rule_engine.rules)
+
     def set_extension_maps(self, new_maps: Dict[str, List[str]]) -> None:
         """Replace the current extension maps with new ones."""
         self.extension_maps = new_maps.copy()
+        self._rebuild_extension_index()
 
     def get_extension_maps(self) -> Dict[str, List[str]]:
         """Get a copy of the current extension maps."""
         return {k: v.copy() for k, v in self.extension_maps.items()}
 
+    def get_categories(self) -> KeysView[str]:
+        """Get a live view of the category names in map order, without copying the maps."""
+        return self.extension_maps.keys()
+
+    def get_category_extensions(self, category: str) -> Sequence[str]:
+        """Get the extensions of a category without copying them. The result must not be modified."""
+        return self.extension_maps.get(category, ())
+
+    def get_categories_with_extension(self, file_extension: str) -> List[str]:
+        """Get every category listing an extension, in map order."""
+        return [category for category, extensions in self.extension_maps.items() if file_extension in extensions]
+
     def add_extension_category(self, category: str, extensions: List[str]) -> None:
         """Add a new category with its associated file extensions."""
+        replaced = category in self.extension_maps
         self.extension_maps[category] = extensions
+        if replaced:
+            # Extensions may have been dropped from the category, so the index is recompiled
+            self._rebuild_extension_index()
+        else:
+            # A new category is last in map order, it only claims extensions nobody else has
+            for ext in extensions:
+                self.rule_engine.setdefault_extension(ext, category)
 
     def add_extensions_to_category(self, category: str, extensions: List[str]) -> None:
         """Add new extensions to an existing category."""
         if category in self.extension_maps:
             self.extension_maps[category].extend(extensions)
+            # Only rebuild when an added extension is owned by a category later in map order
+            categories = list(self.extension_maps)
+            position = categories.index(category)
+            for ext in extensions:
+                owner = self.rule_engine.setdefault_extension(ext, category)
+                if owner != category and categories.index(owner) > position:
+                    self._rebuild_extension_index()
+                    break
         else:
             self.add_extension_category(category, extensions)
 
+    def remove_extensions_from_category(self, category: str, extensions: List[str]) -> None:
+        """Remove extensions from a category, leaving the other categories as they are."""
+        category_extensions = self.extension_maps.get(category)
+        if category_extensions is None:
+            return
+
+        removed = set(extensions)
+        category_extensions[:] = [ext for ext in category_extensions if ext not in removed]
+        for ext in removed:
+            if self.rule_engine.get_extension_category(ext) != category:
+                continue
+            # Hand the extension to the next category listing it, if any
+            owners = self.get_categories_with_extension(ext)
+            if owners:
+                self.rule_engine.set_extension(ext, owners[0])
+            else:
+                self.rule_engine.remove_extension(ext)
+
     def remove_category(self, category: str) -> None:
         """Remove a category and its associated extensions."""
         if category in self.extension_maps:
             del self.extension_maps[category]
+            self._rebuild_extension_index()
 
     def get_category_for_extension(self, file_extension: str) -> str:
         """Determine which category a file extension belongs to."""
-        for category, extensions in self.extension_maps.items():
-            if file_extension.lower() in extensions:
-                return category
-        return 'Others'  # Default category for unrecognized extensions
+        # Default category for unrecognized extensions is Others
+        return self.rule_engine.get_extension_category(file_extension) or 'Others'
 
-    def get_required_folders(self, directory: str) -> set:
-        """Determine which category folders are needed based on files present."""
-        required_folders = set()
-
-        for filename in os.listdir(directory):
-            if os.path.isfile(os.path.join(directory, filename)):
-                file_extension = os.path.splitext(filename)[1].lower()
-                folder_found = False
-
-                # Check if the file belongs to any category
-                for category, extensions in self.extension_maps.items():
-                    if file_extension in extensions:
-                        required_folders.add(category)
-                        folder_found = True
-                        break
+    def get_category_for_name(self, name: str) -> str:
+        """Determine which category a file belongs to, by the name rules then its longest known extension."""
+        return self.rule_engine.classify(name)[0] or 'Others'
+
+    def _classify_name(self, name: str) -> Tuple[str, str | None]:
+        """Get the category of a file name and the extension it was found by, None when a name rule decided."""
+        if self._stats is not None:
+            start_time = time.perf_counter()
+            category, file_extension = self.rule_engine.classify(name)
+            self._stats.add_thread_time('classify', time.perf_counter() - start_time)
+        else:
+            category, file_extension = self.rule_engine.classify(name)
+        return category or 'Others', file_extension
+
+    def _ambiguous_extensions(self) -> set:
+        """Get the extensions listed in several categories."""
+        counts = Counter(ext for extensions in self.extension_maps.values() for ext in extensions)
+        return {ext for ext, count in counts.items() if count > 1}
 
-                # If no category found, file will go to Others
-                if not folder_found:
-                    required_folders.add('Others')
+    def _needs_sniffing(self, file_extension: str | None, ambiguous: set) -> bool:
+        """Whether a file's content must be read to classify it, only when its extension isn't conclusive."""
+        if file_extension is None:
+            # Classified by a name rule, which is as conclusive as it gets
+            return False
+        file_extension = file_extension.lower()
+        return (self.content_sniffer.check_known_extensions or not file_extension
+                or file_extension not in self.rule_engine.extensions or file_extension in ambiguous)
+
+    def _content_category(self, file_extension: str, category: str, sniffed: str | None, ambiguous: set) -> str:
+        """Choose between the category of a file's extension and that of its content."""
+        if sniffed is None or sniffed == category or sniffed not in self.extension_maps:
+            return category
+        file_extension = file_extension.lower()
+        if file_extension in ambiguous and sniffed not in self.get_categories_with_extension(file_extension):
+            # The content settles which of the extension's categories is right, it doesn't override them all
+            return category
+        return sniffed
+
+    def _sniff_plan(self, plan: OrganizePlan, positions: List[int]) -> None:
+        """Reclassify planned files by their content, reading them on the sniffer's thread pool."""
+        ambiguous = self._ambiguous_extensions()
+        paths = [os.path.join(plan.directory, plan.names[position]) for position in positions]
+        for position, sniffed in zip(positions, self.content_sniffer.classify_many(paths)):
+            name, category, _ = plan[position]
+            content_category = self._content_category(self._classify_name(name)[1], category, sniffed, ambiguous)
+            if content_category != category:
+                plan.category_ids[position] = plan.get_category_id(content_category)
+                # A second event for the same file, with the category it will really go to
+                self.emit(FileClassified(name, content_category))
+        self.content_sniffer.save()
+
+    def _dedupe_plan(self, plan: OrganizePlan) -> OrganizePlan:
+        """Find the identical files of a plan and apply the duplicate finder's policy to them."""
+        start_time = time.perf_counter()
+        paths = [os.path.join(plan.directory, name) for name in plan.names]
+        positions = {path: position for position, path in enumerate(paths)}
+        groups = self.duplicate_finder.find(zip(paths, plan.sizes))
+        # Position of each copy -> position of the file kept in its place
+        duplicates = {positions[path]: positions[group[0]] for group in groups for path in group[1:]}
+
+        if self.duplicate_finder.policy == 'skip':
+            plan = plan.without(duplicates)
+        elif self.duplicate_finder.policy == 'category':
+            for position in duplicates:
+                plan.category_ids[position] = plan.get_category_id(DUPLICATES_CATEGORY)
+                self.emit(FileClassified(plan.names[position], DUPLICATES_CATEGORY))
+        else:
+            plan.duplicates.update(duplicates)
 
-        return required_folders
+        self._count('open', self.duplicate_finder.partial_hashed + self.duplicate_finder.fully_hashed)
+        self.emit(PhaseFinished('dedupe', len(duplicates), 0, time.perf_counter() - start_time))
+        return plan
+
+    def _link_duplicate(self, duplicate_path: str, kept_path: str) -> bool:
+        """Replace a moved duplicate with a hard link to the kept copy. Returns whether it succeeded."""
+        try:
+            if os.path.samefile(duplicate_path, kept_path):
+                return True
+            # A saved plan may be old, the copies are compared again before one of them is dropped
+            if not DuplicateFinder.same_content(duplicate_path, kept_path):
+                raise ValueError("The file changed since it was found to be a duplicate")
+            temporary_path = os.path.join(os.path.dirname(duplicate_path),
+                                          f".{os.path.basename(duplicate_path)}.linking")
+            self._count('link')
+            os.link(kept_path, temporary_path)
+            try:
+                os.replace(temporary_path, duplicate_path)
+            except OSError:
+                os.unlink(temporary_path)
+                raise
+        except Exception as e:
+            self.emit(OperationError('dedupe', duplicate_path, str(e)))
+            return False
+        return True
+
+    def _scan_entries(self, directory: str) -> Iterator[Tuple[os.DirEntry, str, str | None]]:
+        """
+        Yield the files to organize in a directory with their category, using a single scandir pass.
+
+        Each file comes with the extension it was classified by, None when a name rule decided.
+        """
+        with os.scandir(directory) as scanner:
+            for entry in scanner:
+                # Skip hidden files and directories, DirEntry caches the file type so no extra stat is made
+                if entry.name.startswith('.') or entry.is_dir():
+                    continue
+
+                category, file_extension = self._classify_name(entry.name)
+                if self.event_sink is not None:
+                    self.event_sink(FileClassified(entry.name, category))
+                yield entry, category, file_extension
+
+    def scan_directory(self, directory: str) -> List[Tuple[str, str]]:
+        """List the files to organize in a directory with their category, using a single scandir pass."""
+        return [(entry.name, category) for entry, category, _ in self._scan_entries(directory)]
+
+    @instrumented('plan')
+    def plan_organization(self, directory: str, with_sizes: bool = True,
+                          names: Iterable[str] | None = None) -> OrganizePlan:
+        """
+        Decide where every file of a directory goes, without moving anything.
+
+        Args:
+            directory (str): The directory to plan
+            with_sizes (bool): Record file sizes in the plan, which costs a stat per file on POSIX,
+                               always done when there is a duplicate finder as it needs them
+            names (Iterable[str] | None): Plan only these files of the directory instead of listing it,
+                                          those that no longer exist are left out
+        """
+        with_sizes = with_sizes or self.duplicate_finder is not None
+        plan = OrganizePlan(os.path.abspath(directory))
+        start_time = time.perf_counter()
+        self.emit(ScanStarted(plan.directory))
+        # Files whose extension isn't conclusive, to classify by content when there is a sniffer
+        ambiguous = self._ambiguous_extensions() if self.content_sniffer is not None else None
+        to_sniff = []
+
+        scan_errors = 0
+        if names is not None:
+            for name in names:
+                size = -1
+                if with_sizes:
+                    try:
+                        size = os.lstat(os.path.join(plan.directory, name)).st_size
+                    except FileNotFoundError:
+                        # Removed since it was named, there is nothing to organize
+                        continue
+                    except OSError as e:
+                        self.emit(OperationError('scan', os.path.join(plan.directory, name), str(e)))
+                        scan_errors += 1
+                        continue
+                category, file_extension = self._classify_name(name)
+                if self.event_sink is not None:
+                    self.event_sink(FileClassified(name, category))
+                if ambiguous is not None and self._needs_sniffing(file_extension, ambiguous):
+                    to_sniff.append(len(plan))
+                plan.add(name, category, size)
+        else:
+            for entry, category, file_extension in self._scan_entries(plan.directory):
+                if ambiguous is not None and self._needs_sniffing(file_extension, ambiguous):
+                    to_sniff.append(len(plan))
+                # Links are moved as links, so their own size is the one that matters
+                size = entry.stat(follow_symlinks=False).st_size if with_sizes else -1
+                plan.add(entry.name, category, size)
+
+        self._count('scandir', names is None)
+        self._count('stat', len(plan) if with_sizes else 0)
+
+        if to_sniff:
+            with self._phase('sniff'):
+                self._sniff_plan(plan, to_sniff)
+        if self.duplicate_finder is not None:
+            plan = self._dedupe_plan(plan)
+
+        self.emit(PhaseFinished('scan', len(plan), scan_errors, time.perf_counter() - start_time))
+        return plan
+
+    def get_required_folders(self, directory: str) -> set:
+        """Determine which category folders are needed based on files present."""
+        return {category for _, category in self.scan_directory(directory)}
 
     def create_category_folders(self, directory: str) -> None:
         """Create only the necessary category folders based on files present."""
@@ -76,71 +412,701 @@ class FolderOrganizer:
 
         for folder in required_folders:
             folder_path = os.path.join(directory, folder)
-            if not os.path.exists(folder_path):
-                os.makedirs(folder_path)
+            os.makedirs(folder_path, exist_ok=True)
 
-    def organize_folder(self, directory: str) -> None:
-        """Organize files in the specified directory into categories."""
-        # Convert directory to absolute path
-        directory = os.path.abspath(directory)
+    def _move_to_category(self, directory: str, item: str, category: str, index: DestinationIndex,
+                          destination_root: str | None = None, defer: bool = False) -> List[Tuple[str, str]]:
+        """
+        Move one file into its category folder and return the (destination, original) pairs of the moves made,
+        none when it is skipped.
+
+        The category folder is created in destination_root, which defaults to the file's own directory.
+        A name already taken there is handled by the collision policy, a file is never overwritten.
+        With defer, a file that would swap places with an older one, or whose category folder can't be created
+        as a file of that name is in the way, raises _MoveDeferred instead.
+        """
+        item_path = os.path.join(directory, item)
+
+        # Create destination path
+        destination_folder = os.path.join(directory if destination_root is None else destination_root, category)
+
+        # Move file to appropriate category folder
+        if destination_folder not in index and destination_folder == item_path:
+            # The file has the name of its own category folder, set it aside while the folder is created
+            aside_path = os.path.join(directory, f".{item}.organizing")
+            self._move_file(item_path, aside_path)
+            try:
+                index.add_folder(destination_folder)
+                return self._place_file(index, destination_folder, item, aside_path, item_path, defer)
+            except BaseException:
+                self._restore_set_aside(index, destination_folder, aside_path, item_path)
+                raise
+
+        if destination_folder not in index:
+            try:
+                index.add_folder(destination_folder)
+            except FileExistsError:
+                if not defer:
+                    raise
+                # The file in the way may be one of the operation, not moved out yet
+                raise _MoveDeferred()
+        return self._place_file(index, destination_folder, item, item_path, item_path, defer)
+
+    def _place_file(self, index: DestinationIndex, destination_folder: str, item: str, source_path: str,
+                    item_path: str, defer: bool) -> List[Tuple[str, str]]:
+        """Move a file from source_path into a listed category folder, see _move_to_category."""
+        if index.claim(destination_folder, item):
+            destination_path = os.path.join(destination_folder, item)
+            self._claimed_move(index, destination_folder, item, source_path, destination_path)
+            return [(destination_path, item_path)]
+
+        if self.collision_policy == 'skip':
+            # Left where it is, like the duplicates skipped
+            return []
+
+        taken_path = os.path.join(destination_folder, item)
+
+        if self.collision_policy == 'keep_newer':
+            if defer:
+                # A swap moves a file another worker moved, its moves would be recorded in the order of the
+                # chunks instead of the order they happened in, so undo would replay them wrongly
+                raise _MoveDeferred()
+            # Swaps are rare, one at a time so that two files never swap with the same one
+            with index.swap_lock:
+                if self._is_newer(source_path, taken_path):
+                    # The newer file takes the name, the older one stays next to it under a numbered name
+                    older_name = index.claim_free_name(destination_folder, item)
+                    older_path = os.path.join(destination_folder, older_name)
+                    self._claimed_move(index, destination_folder, older_name, taken_path, older_path)
+                    self._move_file(source_path, taken_path)
+                    return [(older_path, taken_path), (taken_path, item_path)]
+
+        # Renamed, or the older file when keeping the newer one
+        free_name = index.claim_free_name(destination_folder, item)
+        destination_path = os.path.join(destination_folder, free_name)
+        self._claimed_move(index, destination_folder, free_name, source_path, destination_path)
+        return [(destination_path, item_path)]
+
+    def _restore_set_aside(self, index: DestinationIndex, folder: str, aside_path: str, item_path: str) -> None:
+        """Give a file set aside its name back, removing the category folder created in its place if empty."""
+        try:
+            if os.path.isdir(item_path):
+                os.rmdir(item_path)
+                index.forget(folder)
+            self._move_file(aside_path, item_path)
+        except OSError as e:
+            self.emit(OperationError('organize', aside_path,
+                                     f"Could not be renamed back to {os.path.basename(item_path)}: {e}"))
+
+    def _move_file(self, source_path: str, destination_path: str) -> None:
+        """Move a file with the move engine, measuring the move when collecting stats."""
+        stats = self._stats
+        if stats is None:
+            self.move_engine.move(source_path, destination_path)
+            return
+        # The size costs a stat, only paid while collecting stats
+        size = os.lstat(source_path).st_size
+        start_time = time.perf_counter()
+        self.move_engine.move(source_path, destination_path)
+        stats.count('stat')
+        stats.observe_move(time.perf_counter() - start_time, size)
+
+    def _claimed_move(self, index: DestinationIndex, folder: str, name: str, source_path: str,
+                      destination_path: str) -> None:
+        """Move a file to a name claimed in the index, giving the name back if the move fails."""
+        try:
+            self._move_file(source_path, destination_path)
+        except BaseException:
+            index.release(folder, name)
+            raise
+
+    def _is_newer(self, path: str, other_path: str) -> bool:
+        """Whether a file was modified after another one, a folder in the way is never replaced."""
+        self._count('stat', 2)
+        try:
+            other_stat = os.lstat(other_path)
+        except FileNotFoundError:
+            # Claimed by a file of this operation still being moved
+            return False
+        return not stat.S_ISDIR(other_stat.st_mode) and os.lstat(path).st_mtime_ns > other_stat.st_mtime_ns
+
+    def _move_item(self, directory: str, item: str, category: str, index: DestinationIndex,
+                   destination_root: str | None = None, defer: bool = False,
+                   on_file: Callable[[str, str, str | None], None] | None = None) -> List[Tuple[str, str]] | None:
+        """
+        Move one file into its category folder. Returns the (destination, original) pairs, empty when
+        the file is skipped, or None on error.
+
+        on_file is called with the file's name, category and error message, None when it was moved or skipped.
+        _MoveDeferred is raised through, see _move_to_category.
+        """
+        try:
+            moves = self._move_to_category(directory, item, category, index, destination_root, defer)
+        except _MoveDeferred:
+            raise
+        except Exception as e:
+            self.emit(OperationError('organize', os.path.join(directory, item), str(e)))
+            if on_file is not None:
+                on_file(item, category, str(e))
+            return None
+
+        if moves and self.event_sink is not None:
+            # The file's own move is the last one, the others made room for it
+            self.event_sink(FileMoved('organize', moves[-1][1], moves[-1][0], category))
+        if on_file is not None:
+            on_file(item, category, None)
+        return moves
+
+    def _move_back(self, move: Tuple[str, str]) -> None:
+        """Move a file back to its original location, never overwriting a file that is there now."""
+        destination_path, original_path = move
+        self._count('stat')
+        if not os.path.lexists(original_path):
+            self._move_file(destination_path, original_path)
+        elif os.path.isdir(original_path) and not os.path.islink(original_path):
+            # A file named like a category folder goes back where that folder now stands, once it's empty
+            self._replace_empty_folder(destination_path, original_path)
+        else:
+            raise FileExistsError(errno.EEXIST, "A file is already at the original location", original_path)
 
-        # Create category folders
-        self.create_category_folders(directory)
+    def _undo_move(self, move: Tuple[str, str], taken: List[Tuple[str, str]] | None = None,
+                   on_file: Callable[[str, str | None], None] | None = None) -> bool:
+        """
+        Move a single file back to its original location. Returns whether it succeeded.
 
+        When the original location is taken and a taken list is given, the move is added to it to be retried
+        once the other moves are undone, as it may be waiting for another file to leave, instead of failing.
+        So is a move whose file isn't there yet, as it may be waiting for a file swapped with it to come back,
+        and one of a file named like a category folder, waiting for the files still in that folder.
+        on_file is called with the file's path and error message, None when it was moved back, unless the move
+        is left to retry.
+        """
+        destination_path, original_path = move
+        try:
+            self._move_back(move)
+        except OSError as e:
+            if taken is not None and self._is_taken(move, e):
+                taken.append(move)
+                return False
+            error = e
+        except Exception as e:
+            error = e
+        else:
+            if self.event_sink is not None:
+                self.event_sink(FileMoved('undo', destination_path, original_path))
+            if on_file is not None:
+                on_file(destination_path, None)
+            return True
+
+        self.emit(OperationError('undo', destination_path, str(error)))
+        if on_file is not None:
+            on_file(destination_path, str(error))
+        return False
+
+    @staticmethod
+    def _is_taken(move: Tuple[str, str], error: OSError) -> bool:
+        """Whether undoing a move failed because it must wait for other moves to be undone, see _undo_move."""
+        destination_path, original_path = move
+        if isinstance(error, FileExistsError) or error.errno == errno.ENOTEMPTY:
+            return error.filename == original_path
+        return isinstance(error, FileNotFoundError) and error.filename == destination_path
+
+    def _replace_empty_folder(self, file_path: str, folder_path: str) -> None:
+        """Move a file to the path of an empty folder, the folder being removed. The file may be in that folder."""
+        if os.path.dirname(file_path) != folder_path:
+            self._count('rmdir')
+            os.rmdir(folder_path)
+            self._move_file(file_path, folder_path)
+            return
+
+        # The file named like its own category folder: take it out of the folder first
+        aside_path = os.path.join(os.path.dirname(folder_path), f".{os.path.basename(folder_path)}.organizing")
+        self._move_file(file_path, aside_path)
+        try:
+            self._count('rmdir')
+            os.rmdir(folder_path)
+        except OSError:
+            self._move_file(aside_path, file_path)
+            raise
+        self._move_file(aside_path, folder_path)
+
+    @instrumented('organize')
+    def organize_folder(self, directory: str, workers: int = 1, cancel_event: threading.Event | None = None) -> None:
+        """
+        Organize files in the specified directory into categories.
+
+        Args:
+            directory (str): The directory to organize
+            workers (int): Number of threads moving files concurrently, 1 moves files one at a time
+            cancel_event (threading.Event | None): Set from another thread to stop after the files being moved
+        """
+        # Classify every file with a single listing of the directory, then move them
+        self.execute_plan(self.plan_organization(directory, with_sizes=False), workers, cancel_event=cancel_event)
+
+    @instrumented('organize')
+    def execute_plan(self, plan: OrganizePlan, workers: int = 1,
+                     history: MoveHistory | JournalHistory | None = None,
+                     cancel_event: threading.Event | None = None) -> None:
+        """
+        Move the files of a plan into their category folders and record the moves for undo.
+
+        Args:
+            plan (OrganizePlan): The plan to execute, from plan_organization or OrganizePlan.load
+            workers (int): Number of threads moving files concurrently, 1 moves files one at a time
+            history (MoveHistory | JournalHistory | None): Operation from start_operation to add the moves to,
+                                                           by default the plan is an operation of its own
+            cancel_event (threading.Event | None): Set from another thread to stop after the files being moved,
+                                                   the moves done so far are recorded and can be undone
+        """
         # Create a new move history for this operation
-        current_move_history = []
+        current_move_history = self._new_move_history(plan.directory) if history is None else history
+        self._move_plan(plan, current_move_history, workers, cancel_event)
 
-        # Iterate through all files in the directory
-        for item in os.listdir(directory):
-            item_path = os.path.join(directory, item)
+        if history is None:
+            self.finish_operation(current_move_history)
+            # Append to total history moves
+            self.create_move_history(current_move_history)
 
-            # Skip if it's a directory or hidden file
-            if os.path.isdir(item_path) or item.startswith('.'):
-                continue
+    @instrumented('organize')
+    def _move_plan(self, plan: OrganizePlan, history: MoveHistory | JournalHistory, workers: int = 1,
+                   cancel_event: threading.Event | None = None,
+                   on_file: Callable[[str, str, str | None], None] | None = None) -> None:
+        """
+        Move the files of a plan, recording the moves in history in plan order, see execute_plan.
 
-            # Get file extension and category
-            file_extension = os.path.splitext(item)[1].lower()
-            category = self.get_category_for_extension(file_extension)
+        on_file is called from the worker threads after each file, see _move_item.
+        """
+        directory = plan.directory
+        start_time = time.perf_counter()
+        moved = 0
 
-            # Create destination path
-            destination_folder = os.path.join(directory, category)
-            destination_path = os.path.join(destination_folder, item)
+        # Category folders are listed or created lazily, the first time a file needs them,
+        # then names are checked in memory instead of with a stat per file
+        index = DestinationIndex()
+
+        # Destinations of the duplicates to link and of their kept copies, once moved
+        linked_positions = set(plan.duplicates) | set(plan.duplicates.values())
+        destinations: Dict[int, str] = {}
+
+        # Positions whose file must wait for the others, like a swap, moved once the parallel passes are done
+        deferred: List[int] = []
+
+        def move_chunk(positions: Sequence[int], defer: bool = False) -> Tuple[List[Tuple[str, str]], int, int]:
+            moves = []
+            files_moved = chunk_errors = 0
+            for position in positions:
+                try:
+                    file_moves = self._move_item(directory, *plan[position][:2], index, defer=defer,
+                                                 on_file=on_file)
+                except _MoveDeferred:
+                    deferred.append(position)
+                    continue
+                if file_moves is None:
+                    chunk_errors += 1
+                elif file_moves:
+                    moves.extend(file_moves)
+                    files_moved += 1
+                    if position in linked_positions:
+                        destinations[position] = file_moves[-1][0]
+            return moves, files_moved, chunk_errors
+
+        # Files named like a category folder are in the way of that folder, they are moved out first, one at a time.
+        # One named like its own category folder, like an 'Others' file, goes before those it would block.
+        blocking = sorted({position for category in plan.categories for position in plan.names.find(category)},
+                          key=lambda position: (plan[position][0] != plan[position][1], position))
+        if blocking:
+            blocking_positions = set(blocking)
+            passes = [(blocking, 1),
+                      ([position for position in range(len(plan)) if position not in blocking_positions], workers)]
+        else:
+            passes = [(range(len(plan)), workers)]
+
+        errors = 0
+        # Workers receive chunks of files rather than single files to keep the scheduling overhead low.
+        # Chunk results come back in plan order, so the history is the same as a sequential run,
+        # and each chunk is recorded as soon as it is done.
+        for positions, pass_workers in passes:
+            # Parallel passes leave swaps and blocked files for later, see _move_to_category
+            chunk_function = functools.partial(move_chunk, defer=pass_workers > 1)
+            for moves, files_moved, chunk_errors in self._run_chunked(chunk_function, positions, pass_workers,
+                                                                      stop=cancel_event):
+                for move in moves:
+                    history.append(move)
+                moved += files_moved
+                errors += chunk_errors
+
+        # The files left for later, one at a time after every other move is recorded,
+        # so the history follows the real order
+        if deferred and not (cancel_event is not None and cancel_event.is_set()):
+            moves, files_moved, chunk_errors = move_chunk(sorted(deferred))
+            for move in moves:
+                history.append(move)
+            moved += files_moved
+            errors += chunk_errors
+
+        # Duplicates are moved like any file, so undo puts them back, then linked to the copy kept.
+        # Undo moves the link back: the same content, sharing its storage with the kept copy.
+        if not (cancel_event is not None and cancel_event.is_set()):
+            with self._phase('link'):
+                for position, kept in plan.duplicates.items():
+                    if position in destinations and kept in destinations:
+                        errors += not self._link_duplicate(destinations[position], destinations[kept])
 
-            # Move file to appropriate category folder and track the move
+        self._count_index(index)
+
+        self.emit(PhaseFinished('organize', moved, errors, time.perf_counter() - start_time))
+
+    def _walk_tree(self, root: str, mode: str, max_open_directories: int = 64) -> Iterator[Tuple[str, str, str]]:
+        """
+        Yield (folder, name, category) for every file of a tree, depth first.
+
+        Only one scandir iterator is open per level, so memory depends on the tree depth, not its size.
+        Hidden entries, symlinked directories and category folders are never descended into.
+        """
+        category_names = set(self.extension_maps) | {'Others'}
+        # Directories found below max_open_directories levels are walked later, to bound open descriptors
+        deferred = [root]
+
+        while deferred:
+            folders = [deferred.pop()]
             try:
-                shutil.move(item_path, destination_path)
-                # Record the move in the current move history
-                current_move_history.append((destination_path, item_path))
-                print(f"Moved '{item}' to {category} folder")
-            except Exception as e:
-                print(f"Error moving '{item}': {str(e)}")
+                self._count('scandir')
+                scanners = [os.scandir(folders[0])]
+            except OSError as e:
+                if folders[0] == root:
+                    raise
+                self.emit(OperationError('scan', folders[0], str(e)))
+                continue
+
+            while scanners:
+                entry = next(scanners[-1], None)
+                if entry is None:
+                    scanners.pop().close()
+                    folders.pop()
+                    continue
+
+                if entry.name.startswith('.'):
+                    continue
+
+                if not entry.is_dir():
+                    category = self._classify_name(entry.name)[0]
+                    if self.event_sink is not None:
+                        self.event_sink(FileClassified(entry.name, category))
+                    yield folders[-1], entry.name, category
+                    continue
+
+                # Skip the category folders files are moved into: the root ones when flattening,
+                # those of every level when organizing in place
+                if entry.is_symlink() or (entry.name in category_names
+                                          and (mode == 'in_place' or folders[-1] == root)):
+                    continue
+
+                if len(scanners) >= max_open_directories:
+                    deferred.append(entry.path)
+                    continue
+
+                try:
+                    self._count('scandir')
+                    scanners.append(os.scandir(entry.path))
+                    folders.append(entry.path)
+                except OSError as e:
+                    self.emit(OperationError('scan', entry.path, str(e)))
+
+    @instrumented('organize')
+    def organize_tree(self, directory: str, mode: str = 'flatten', workers: int = 1,
+                      cancel_event: threading.Event | None = None) -> None:
+        """
+        Organize every file of a directory tree, streaming the tree instead of listing it first.
+
+        Files are moved in chunks while the tree is being walked, so memory doesn't grow with the
+        tree size, except for the undo history when no journal is used.
+
+        Args:
+            directory (str): The root of the tree to organize
+            mode (str): 'flatten' moves every file into the root's category folders,
+                        'in_place' organizes each directory into its own category folders
+            workers (int): Number of threads moving files concurrently, 1 moves files one at a time
+            cancel_event (threading.Event | None): Set from another thread to stop walking the tree after the
+                                                   files being moved
+        """
+        if mode not in ('flatten', 'in_place'):
+            raise ValueError(f"Unknown tree organization mode: {mode}")
+
+        directory = os.path.abspath(directory)
+        destination_root = directory if mode == 'flatten' else None
+        start_time = time.perf_counter()
+        moved = errors = 0
+        self.emit(ScanStarted(directory))
+
+        # Category folders are listed or created lazily, the first time a file needs them
+        index = DestinationIndex()
+
+        ambiguous = self._ambiguous_extensions() if self.content_sniffer is not None else None
+
+        def move_chunk(chunk: List[Tuple[str, str, str]]) -> Tuple[List[Tuple[str, str]], int, int]:
+            if ambiguous is not None:
+                # Chunks are already spread over the workers, files are read right before being moved
+                sniffed_chunk = []
+                for folder, item, category in chunk:
+                    file_extension = self._classify_name(item)[1]
+                    if self._needs_sniffing(file_extension, ambiguous):
+                        category = self._content_category(
+                            file_extension, category, self.content_sniffer.classify(os.path.join(folder, item)),
+                            ambiguous)
+                    sniffed_chunk.append((folder, item, category))
+                chunk = sniffed_chunk
+            return move_files(chunk, True)
+
+        # Files that must wait for the others, moved once the tree is done, see _move_to_category. The order
+        # of the walk decides whether a file named like a category folder is moved before the files going
+        # into that folder, those met first wait for it.
+        deferred: List[Tuple[str, str, str]] = []
+
+        def move_files(files: List[Tuple[str, str, str]], defer: bool) -> Tuple[List[Tuple[str, str]], int, int]:
+            # Files from different directories can share a name once flattened, the collision policy handles them
+            moves = []
+            files_moved = chunk_errors = 0
+            for folder, item, category in files:
+                try:
+                    file_moves = self._move_item(folder, item, category, index, destination_root, defer)
+                except _MoveDeferred:
+                    deferred.append((folder, item, category))
+                    continue
+                if file_moves is None:
+                    chunk_errors += 1
+                elif file_moves:
+                    moves.extend(file_moves)
+                    files_moved += 1
+            return moves, files_moved, chunk_errors
+
+        # Create a new move history for this operation
+        current_move_history = self._new_move_history(directory)
+        for moves, files_moved, chunk_errors in self._run_chunked(move_chunk, self._walk_tree(directory, mode),
+                                                                  workers, stop=cancel_event):
+            for move in moves:
+                current_move_history.append(move)
+            moved += files_moved
+            errors += chunk_errors
+
+        # The files left for later, one at a time after every other move is recorded, so the history follows
+        # the real order. They are tried again as long as some get through, as a file in the way may itself
+        # have been waiting, then a last pass makes the swaps and reports the files still blocked.
+        defer = True
+        while deferred and not (cancel_event is not None and cancel_event.is_set()):
+            retry = deferred[:]
+            deferred.clear()
+            moves, files_moved, chunk_errors = move_files(retry, defer)
+            for move in moves:
+                current_move_history.append(move)
+            moved += files_moved
+            errors += chunk_errors
+            defer = len(deferred) < len(retry)
+
+        self._count_index(index)
+        self.emit(PhaseFinished('organize', moved, errors, time.perf_counter() - start_time))
+        self.finish_operation(current_move_history)
+        if self.content_sniffer is not None:
+            self.content_sniffer.save()
 
         # Append to total history moves
         self.create_move_history(current_move_history)
 
-    def undo_last_operation(self) -> None:
-        """Undo the last organization operation by moving files back to their original locations."""
+    @instrumented('undo')
+    def undo_last_operation(self, workers: int = 1, cancel_event: threading.Event | None = None) -> None:
+        """
+        Undo the last organization operation by moving files back to their original locations.
+
+        If cancelled, the moves that were not undone yet are put back in the history as the last operation,
+        so undoing again resumes where it stopped.
+
+        Args:
+            workers (int): Number of threads moving files concurrently, 1 moves files one at a time
+            cancel_event (threading.Event | None): Set from another thread to stop after the files being moved
+        """
+        self._undo_last_operation(workers, cancel_event)
+
+    @instrumented('undo')
+    def _undo_last_operation(self, workers: int = 1, cancel_event: threading.Event | None = None,
+                             on_file: Callable[[str, str | None], None] | None = None) -> None:
+        """
+        Undo the last operation, see undo_last_operation.
+
+        on_file is called from the worker threads after each file, see _undo_move.
+        """
         if not self.move_histories:
-            print("No moves to undo.")
+            self.emit(PhaseFinished('undo', 0, 0, 0.0))
             return
 
         # Get the last move history
         last_move_history = self.move_histories.pop()
+        if self._stats is not None:
+            self._stats.directory = last_move_history.directory
+        total = len(last_move_history)
+        start_time = time.perf_counter()
+        undone = errors = 0
+
+        # Moves whose original location was taken, maybe by a file of this operation not moved back yet
+        taken: List[Tuple[str, str]] = []
+
+        def undo_chunk(chunk: List[Tuple[str, str]]) -> Tuple[int, int]:
+            return sum(not self._undo_move(move, taken, on_file) for move in chunk), len(chunk)
+
+        # Journal histories are streamed backwards from disk, never loaded whole.
+        # Cancelling stops between chunks, so the moves left to undo are exactly the oldest ones.
+        if workers > 1:
+            errors, undone = self._undo_in_lanes(reversed(last_move_history), workers, undo_chunk, cancel_event)
+        else:
+            for chunk_errors, attempted in self._run_chunked(undo_chunk, reversed(last_move_history), workers,
+                                                             stop=cancel_event):
+                errors += chunk_errors
+                undone += attempted
+
+        # Retried once the rest is undone, as long as some of them get through: a file may be waiting
+        # for another one to leave, like one that swapped places with an older file of the same name
+        errors -= len(taken)
+        while taken:
+            retry, taken = taken, []
+            errors += sum(not self._undo_move(move, taken, on_file) for move in retry) - len(taken)
+            if len(taken) == len(retry):
+                # None of them got through, their locations are taken for good
+                errors += sum(not self._undo_move(move, on_file=on_file) for move in taken)
+                break
+
+        self.emit(PhaseFinished('undo', undone - errors, errors, time.perf_counter() - start_time))
+
+        if undone < total:
+            self._restore_remaining(last_move_history, total - undone)
+        if self.journal is not None:
+            self.journal.mark_undone(last_move_history)
+
+    @staticmethod
+    def _undo_key(move: Tuple[str, str]) -> str:
+        """The path a move must be undone in order with, see _undo_in_lanes."""
+        destination_path, original_path = move
+        # A move within a category folder is the older file of a keep_newer swap leaving the name it had
+        if os.path.dirname(original_path) == os.path.dirname(destination_path):
+            return original_path
+        return destination_path
+
+    def _undo_in_lanes(self, moves: Iterator[Tuple[str, str]], workers: int, undo_chunk,
+                       stop: threading.Event | None = None, chunk_size: int = 64) -> Tuple[int, int]:
+        """
+        Undo moves on worker threads, returning the number of errors and of moves attempted.
+
+        When files swapped places, a path is the destination of several moves of an operation, and those
+        must be undone in the reverse order they were made in. Each worker is a lane undoing its moves in
+        order, and the moves of a path always go to the same lane. Once stop is set no move is handed
+        out any more, the moves handed out are all undone, so those left are exactly the oldest ones.
+        """
+        lanes = [queue.Queue(maxsize=2) for _ in range(workers)]
+        chunks: List[List[Tuple[str, str]]] = [[] for _ in range(workers)]
+        # Errors and moves attempted by each lane
+        results = [[0, 0] for _ in range(workers)]
 
-        for destination_path, original_path in reversed(last_move_history):
+        def run_lane(lane: int) -> None:
+            while (chunk := lanes[lane].get()) is not None:
+                chunk_errors, attempted = undo_chunk(chunk)
+                results[lane][0] += chunk_errors
+                results[lane][1] += attempted
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_lane, lane) for lane in range(workers)]
             try:
-                shutil.move(destination_path, original_path)
-                print(f"Moved '{os.path.basename(destination_path)}' back to original location")
-            except Exception as e:
-                print(f"Error undoing move for '{os.path.basename(destination_path)}': {str(e)}")
+                for move in moves:
+                    if stop is not None and stop.is_set():
+                        break
+                    lane = hash(self._undo_key(move)) % workers
+                    chunks[lane].append(move)
+                    if len(chunks[lane]) >= chunk_size:
+                        lanes[lane].put(chunks[lane])
+                        chunks[lane] = []
+            finally:
+                for lane in range(workers):
+                    if chunks[lane]:
+                        lanes[lane].put(chunks[lane])
+                    lanes[lane].put(None)
+            for future in futures:
+                future.result()
+
+        return sum(lane_errors for lane_errors, _ in results), sum(attempted for _, attempted in results)
+
+    def _restore_remaining(self, history: MoveHistory | JournalHistory, count: int) -> None:
+        """Put the first count moves of a partly undone history back in the move histories."""
+        remaining = self._new_move_history(history.directory)
+        for move in islice(iter(history), count):
+            remaining.append(move)
+        self.finish_operation(remaining)
+        self.create_move_history(remaining)
+
+    @staticmethod
+    def _run_chunked(function, items: Iterable, workers: int, chunk_size: int = 256,
+                     stop: threading.Event | None = None):
+        """
+        Apply a function to consecutive chunks of items, on a thread pool when workers > 1.
+
+        Results are yielded in item order and only a few chunks are in flight at once,
+        so items can be a stream of any length. Once stop is set no new chunk is started,
+        the chunks in flight still complete and their results are yielded.
+        """
+        if workers > 1 and isinstance(items, Sized):
+            # Spread small inputs so that every worker gets several chunks
+            chunk_size = max(1, min(chunk_size, len(items) // (workers * 4)))
+
+        iterator = iter(items)
+
+        def next_chunk() -> list:
+            if stop is not None and stop.is_set():
+                return []
+            return list(islice(iterator, chunk_size))
+
+        chunks = iter(next_chunk, [])
 
-    def create_move_history(self, new_history_move: List[Tuple[str, str]]) -> None:
+        if workers <= 1:
+            yield from map(function, chunks)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(function, chunk))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def use_journal(self, journal: MoveJournal | None) -> None:
+        """Persist move histories in a journal, loading the operations it can still undo. None disables it."""
+        self.journal = journal
+        self.move_histories = [] if journal is None else journal.operations()[-15:]
+
+    def _new_move_history(self, directory: str) -> MoveHistory | JournalHistory:
+        """Start the move history of an operation, written to the journal as moves are recorded when there is one."""
+        if self.journal is not None:
+            return self.journal.begin(directory)
+        return MoveHistory(directory)
+
+    def start_operation(self, directory: str) -> MoveHistory | JournalHistory:
+        """
+        Start an operation that several execute_plan calls add their moves to, like a watch session.
+
+        The operation is added to the move histories right away, end it with finish_operation.
+        """
+        history = self._new_move_history(os.path.abspath(directory))
+        self.create_move_history(history)
+        return history
+
+    def finish_operation(self, history: MoveHistory | JournalHistory) -> None:
+        """End an operation, making its journal records durable."""
+        if self.journal is not None:
+            self.journal.commit(history)
+
+    def create_move_history(self, new_history_move: MoveHistory | JournalHistory | List[Tuple[str, str]]) -> None:
         """Appends a new history move to the move histories list, maintaining a maximum of 15 entries."""
         if len(self.move_histories) >= 15:
             del self.move_histories[0]
         self.move_histories.append(new_history_move)
 
-    def get_move_history(self, index: int = -1) -> list:
+    def get_move_history(self, index: int = -1) -> MoveHistory | JournalHistory | list:
         """Get the move history for a specific operation. Defaults to the last operation."""
         if not self.move_histories:
             return []
@@ -148,12 +1114,15 @@ class FolderOrganizer:
 
     def clear_move_histories(self) -> None:
         """Clear all move histories."""
+        if self.journal is not None:
+            for history in self.move_histories:
+                self.journal.discard(history)
         self.move_histories.clear()
 
 
 def main():
-    # Create organizer instance
-    organizer = FolderOrganizer()
+    # Create organizer instance, printing a line per moved file
+    organizer = FolderOrganizer(event_sink=print_event)
 
     # Example of adding new category and extensions
     # organizer.add_extension_category('eBooks', ['.epub', '.mobi', '.azw'])
@@ -166,6 +1135,14 @@ def main():
             break
         print("Invalid directory path. Please try again.")
 
+    # Keep the undo history in the directory, so it survives a restart
+    organizer.use_journal(MoveJournal.next_to(directory))
+    if organizer.get_move_history():
+        undo_choice = input("Do you want to undo the previous organization of this directory? (yes/no): ")
+        if undo_choice.strip().lower() == 'yes':
+            organizer.undo_last_operation()
+            return
+
     # Organize the folder
     organizer.organize_folder(directory)
     print("Organization complete!")
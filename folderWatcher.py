@@ -0,0 +1,245 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Set
+from folderOrganizer import FolderOrganizer
+from moveJournal import MoveJournal
+from organizerEvents import OperationError, print_event
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class FolderWatcher:
+    def __init__(self, organizer: FolderOrganizer, directory: str, settle_time: float = 2.0,
+                 batch_interval: float = 1.0, poll_interval: float = 5.0, use_inotify: bool | None = None,
+                 organize_existing: bool = True, workers: int = 1):
+        """
+        Keep a directory organized by moving new files as they arrive.
+
+        On Linux the directory is watched with inotify, elsewhere it is polled, listing it again only
+        when its mtime changes. A file is organized once its size and mtime have not changed for
+        settle_time seconds, so files still being written are left alone. New files are organized in
+        batches, all recorded in a single operation of the organizer's undo history.
+
+        Args:
+            organizer (FolderOrganizer): Organizer classifying and moving the files
+            directory (str): The directory to watch
+            settle_time (float): Seconds a file must stay unchanged before it is organized
+            batch_interval (float): Seconds between two batches of moves
+            poll_interval (float): Seconds between two checks of the directory when polling
+            use_inotify (bool | None): Force or disable inotify, by default it is used when available
+            organize_existing (bool): Also organize the files already in the directory when starting
+            workers (int): Number of threads moving the files of a batch
+        """
+        self.organizer = organizer
+        self.directory = os.path.abspath(directory)
+        self.settle_time = settle_time
+        self.batch_interval = batch_interval
+        self.poll_interval = poll_interval
+        self.use_inotify = sys.platform.startswith('linux') if use_inotify is None else use_inotify
+        self.organize_existing = organize_existing
+        self.workers = workers
+
+        # Files waiting to settle: name -> [size, mtime_ns, monotonic time of the last change seen]
+        self.pending: Dict[str, list] = {}
+        # Files left alone because they were there before the watch started
+        self.ignored: Set[str] = set()
+        self.organized_count = 0
+        self._stop_event = threading.Event()
+        self._directory_mtime_ns = None
+        self._inotify_fd = None
+
+    def stop(self) -> None:
+        """Ask a running watcher to stop after its current batch."""
+        self._stop_event.set()
+
+    def run(self) -> None:
+        """Watch the directory until stop is called, organizing files as they settle."""
+        self._stop_event.clear()
+        if self.use_inotify:
+            self._inotify_fd = self._open_inotify()
+
+        history = self.organizer.start_operation(self.directory)
+        next_poll = 0.0
+        try:
+            self.rescan()
+            if not self.organize_existing:
+                # Only files arriving from now on are organized
+                self.ignored = set(self.pending)
+                self.pending.clear()
+
+            while not self._stop_event.is_set():
+                if self._inotify_fd is not None:
+                    self._read_events(self.batch_interval)
+                else:
+                    if time.monotonic() >= next_poll:
+                        self.poll()
+                        next_poll = time.monotonic() + self.poll_interval
+                    self._stop_event.wait(self.batch_interval)
+
+                self.organize_ready(history)
+        finally:
+            self.organizer.finish_operation(history)
+            if self._inotify_fd is not None:
+                os.close(self._inotify_fd)
+                self._inotify_fd = None
+
+    def _open_inotify(self) -> int | None:
+        """Start watching the directory with inotify, returning None when it isn't available."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, "inotify_add_watch failed")
+            return fd
+        except (OSError, AttributeError) as e:
+            self.organizer.emit(OperationError('watch', self.directory, f"inotify unavailable, polling instead: {e}"))
+            return None
+
+    def _read_events(self, timeout: float) -> None:
+        """Wait up to timeout seconds for inotify events and mark the files they name as changed."""
+        readable, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if not readable:
+            return
+
+        try:
+            data = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        now = time.monotonic()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped by the kernel, fall back to listing the directory once
+                self.rescan()
+            elif name and not mask & IN_ISDIR and not name.startswith('.'):
+                if mask & IN_MOVED_TO or mask & IN_CREATE:
+                    self.ignored.discard(name)
+                if name not in self.ignored:
+                    self.pending.setdefault(name, [-1, -1, now])[2] = now
+
+    def poll(self) -> None:
+        """Check the directory, listing it again only if entries were added or removed since the last listing."""
+        try:
+            directory_mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError as e:
+            self.organizer.emit(OperationError('watch', self.directory, str(e)))
+            return
+
+        if directory_mtime_ns != self._directory_mtime_ns:
+            self.rescan()
+
+    def rescan(self) -> None:
+        """List the directory and start tracking the files that aren't tracked yet."""
+        try:
+            self._directory_mtime_ns = os.stat(self.directory).st_mtime_ns
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            self.organizer.emit(OperationError('watch', self.directory, str(e)))
+            return
+
+        now = time.monotonic()
+        names = set()
+        for entry in entries:
+            if entry.name.startswith('.') or entry.is_dir():
+                continue
+            names.add(entry.name)
+            if entry.name not in self.pending and entry.name not in self.ignored:
+                self.pending[entry.name] = [-1, -1, now]
+
+        # Ignored files that went away may come back as new arrivals
+        self.ignored &= names
+
+    def ready_files(self) -> List[str]:
+        """Get the pending files that have not changed for settle_time seconds, forgetting those that are gone."""
+        now = time.monotonic()
+        ready = []
+
+        for name, state in list(self.pending.items()):
+            if now - state[2] < self.settle_time:
+                continue
+
+            try:
+                file_stat = os.lstat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                del self.pending[name]
+                continue
+            except OSError as e:
+                self.organizer.emit(OperationError('watch', os.path.join(self.directory, name), str(e)))
+                continue
+
+            if stat.S_ISDIR(file_stat.st_mode):
+                del self.pending[name]
+            elif ((file_stat.st_size, file_stat.st_mtime_ns) == (state[0], state[1])
+                  or time.time_ns() - file_stat.st_mtime_ns >= self.settle_time * 1e9):
+                # Unchanged since the last check, or last written more than settle_time ago
+                ready.append(name)
+            else:
+                # Still being written: wait for it to settle
+                state[:] = [file_stat.st_size, file_stat.st_mtime_ns, now]
+
+        return ready
+
+    def organize_ready(self, history) -> int:
+        """Organize the files that have settled. Returns the number of files handled."""
+        ready = self.ready_files()
+        if not ready:
+            return 0
+
+        for name in ready:
+            del self.pending[name]
+
+        plan = self.organizer.plan_organization(self.directory, with_sizes=False, names=ready)
+        self.organizer.execute_plan(plan, self.workers, history)
+        self.organized_count += len(ready)
+        return len(ready)
+
+
+def main():
+    # Get directory path from user
+    while True:
+        directory = input("Enter the directory path to watch: ").strip()
+        if os.path.isdir(directory):
+            break
+        print("Invalid directory path. Please try again.")
+
+    # Keep the undo history in the directory, like the organizer CLI
+    organizer = FolderOrganizer(journal=MoveJournal.next_to(directory), event_sink=print_event)
+    watcher = FolderWatcher(organizer, directory)
+
+    print(f"Watching '{watcher.directory}', press Ctrl+C to stop.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"Stopped watching. {watcher.organized_count} files organized.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 import os
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import string
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from extensionMaps import EXTENSION_MAPS
+from workloadProfile import PRESETS, WorkloadProfile, get_profile
 
 
 class TestFileGenerator:
@@ -65,6 +68,162 @@ class TestFileGenerator:
 
         print(f"\nTotal files created: {total_files}")
 
+    def generate_test_files_fast(self, directory: str, files_per_category: int = 3, seed: int | None = None,
+                                 workers: int = 8, file_size: int = 0, sparse: bool = False) -> int:
+        """
+        Generate the same set of test files as generate_test_files, fast enough for million-file fixtures.
+
+        Names are drawn from a seeded generator all at once, so a seed always gives the same fixture.
+        Files are created by several threads with a single open per file, and only a summary is printed.
+
+        Args:
+            directory (str): The directory where files should be created
+            files_per_category (int): Number of files to create for each extension
+            seed (int | None): Seed of the name generator, None for different names on every run
+            workers (int): Number of threads creating files
+            file_size (int): Size of every file in bytes, 0 for empty files
+            sparse (bool): Give files their size without writing data, they take no disk space
+
+        Returns:
+            int: The number of files created
+        """
+        directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+
+        start_time = time.perf_counter()
+        rng = random.Random(seed)
+        extensions = [ext for extensions in self.extension_maps.values() for ext in extensions]
+        total = len(extensions) * files_per_category
+
+        # One call for the random part of every name, the counter keeps names unique
+        random_part = rng.randbytes(4 * total).hex()
+        names = [f"{random_part[8 * i:8 * i + 8]}_{i}{extensions[i // files_per_category]}" for i in range(total)]
+        content = rng.randbytes(min(file_size, 1024 * 1024)) if file_size and not sparse else b''
+
+        created = self.create_files(directory, [(name, file_size) for name in names], workers, sparse, content)
+        print(f"Total files created: {created} in {time.perf_counter() - start_time:.1f}s")
+        return created
+
+    def generate_workload(self, directory: str, profile: WorkloadProfile, file_count: int,
+                          seed: int | None = None, workers: int = 8) -> int:
+        """
+        Generate test files shaped by a workload profile, see workloadProfile.py for the presets.
+
+        Args:
+            directory (str): The directory where files should be created
+            profile (WorkloadProfile): Distribution of extensions, sizes, nesting and collisions
+            file_count (int): Number of files to create, not counting collisions
+            seed (int | None): Seed of the generator, None for a different workload on every run
+            workers (int): Number of threads creating files
+
+        Returns:
+            int: The number of files created
+        """
+        directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+
+        start_time = time.perf_counter()
+        rng = random.Random(seed)
+
+        # Known extensions ranked by popularity, in a seeded order, with the category each one is sorted into
+        categories = {}
+        for category, extensions in self.extension_maps.items():
+            for ext in extensions:
+                categories.setdefault(ext, category)
+        known = list(categories)
+        rng.shuffle(known)
+        unknown = []
+        while len(unknown) < profile.unknown_extension_count:
+            ext = '.' + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 5)))
+            if ext not in categories and ext not in unknown:
+                unknown.append(ext)
+
+        drawn = rng.choices(known, cum_weights=profile.extension_weights(len(known)), k=file_count)
+        random_part = rng.randbytes(4 * file_count).hex()
+        files = []
+        folders = set()
+
+        for i in range(file_count):
+            kind = rng.random()
+            if kind < profile.no_extension_fraction:
+                ext = ''
+            elif kind < profile.no_extension_fraction + profile.unknown_extension_fraction:
+                ext = rng.choice(unknown)
+            else:
+                ext = drawn[i]
+
+            folder = ''
+            if profile.max_depth and rng.random() < profile.nested_fraction:
+                folder = os.path.join(*(f"folder{rng.randrange(profile.folders_per_level)}"
+                                        for _ in range(rng.randint(1, profile.max_depth))))
+                folders.add(folder)
+
+            name = os.path.join(folder, f"{random_part[8 * i:8 * i + 8]}_{i}{ext}")
+            files.append((name, profile.draw_size(rng)))
+
+            if rng.random() < profile.collision_rate:
+                # The same name already in the category folder the file will be moved to
+                category_folder = os.path.join(folder, categories.get(ext, 'Others'))
+                folders.add(category_folder)
+                files.append((os.path.join(category_folder, os.path.basename(name)), 0))
+
+        # Files standing where the organizer will want to create category folders
+        category_names = [category for category in list(self.extension_maps) + ['Others'] if category not in folders]
+        for category in rng.sample(category_names, min(profile.category_name_files, len(category_names))):
+            files.append((category, 0))
+
+        for folder in folders:
+            os.makedirs(os.path.join(directory, folder), exist_ok=True)
+
+        content = rng.randbytes(1024 * 1024) if profile.size_distribution != 'empty' and not profile.sparse else b''
+        created = self.create_files(directory, files, workers, profile.sparse, content)
+        total_size = sum(size for _, size in files)
+        print(f"Total files created: {created} ({total_size / (1024 * 1024):.1f} MB, profile '{profile.name}') "
+              f"in {time.perf_counter() - start_time:.1f}s")
+        return created
+
+    def create_files(self, directory: str, files: List[Tuple[str, int]], workers: int = 8, sparse: bool = False,
+                     content: bytes = b'') -> int:
+        """
+        Create (relative path, size) files with a thread pool, printing a line only if some failed.
+
+        Returns:
+            int: The number of files created
+        """
+        def create_chunk(chunk: List[Tuple[str, int]]) -> Tuple[int, str | None]:
+            errors, first_error = 0, None
+            for name, size in chunk:
+                try:
+                    self.create_file_fast(os.path.join(directory, name), size, sparse, content)
+                except OSError as e:
+                    errors += 1
+                    first_error = first_error or f"{name}: {e}"
+            return errors, first_error
+
+        chunks = [files[i:i + 1024] for i in range(0, len(files), 1024)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = list(executor.map(create_chunk, chunks))
+
+        errors = sum(chunk_errors for chunk_errors, _ in results)
+        if errors:
+            first_error = next(error for _, error in results if error is not None)
+            print(f"{errors} files could not be created, first error: {first_error}")
+        return len(files) - errors
+
+    @staticmethod
+    def create_file_fast(filepath: str, file_size: int = 0, sparse: bool = False, content: bytes = b''):
+        """Create a file of file_size bytes, filled by repeating content unless it's sparse."""
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            if sparse:
+                os.ftruncate(fd, file_size)
+            elif file_size:
+                written = 0
+                while written < file_size:
+                    written += os.write(fd, content[:file_size - written])
+        finally:
+            os.close(fd)
+
 
 def main():
     generator = TestFileGenerator()
@@ -77,6 +236,21 @@ def main():
             break
         print("Please enter a valid directory path.")
 
+    # Optionally shape the files like a real folder
+    while True:
+        profile_name = input(f"Enter a workload profile ({', '.join(PRESETS)}, a .json file, "
+                             f"or nothing for a few files per extension): ").strip()
+        if not profile_name:
+            break
+        try:
+            profile = get_profile(profile_name)
+            file_count = int(input("Enter number of files to create (default is 10000): ") or 10000)
+        except (ValueError, OSError) as e:
+            print(f"Invalid profile: {e}")
+            continue
+        generator.generate_workload(directory, profile, file_count)
+        return
+
     # Get number of files per category
     while True:
         try:
@@ -87,8 +261,11 @@ def main():
         except ValueError:
             print("Please enter a valid number.")
 
-    # Generate the test files
-    generator.generate_test_files(directory, files_per_category)
+    # Generate the test files, fast mode creates empty files and prints only a summary
+    if input("Use fast mode, creating empty files? (y/n): ").lower() == 'y':
+        generator.generate_test_files_fast(directory, files_per_category)
+    else:
+        generator.generate_test_files(directory, files_per_category)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,34 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from typing import Union
+from typing import List, Union
+from collections import deque
 import sys
 import os
-import builtins
-import shutil
 import json
+import queue
+import threading
 from folderOrganizer import FolderOrganizer
+from moveEngine import MoveEngine
+from moveJournal import MoveJournal
+from organizePlan import OrganizePlan
+from organizerEvents import BatchingSink, FileMoved, OperationError, PhaseFinished, format_event
+from rateLimiter import RateLimiter
+
+# Undo journal shared by every directory organized from the GUI
+JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".folder_organizer", "journal.jsonl")
+
+# Minimum seconds between two batches of progress events sent by the worker thread
+PROGRESS_INTERVAL = 0.05
+
+# Milliseconds between two refreshes of the window while organizing or undoing, about 30 frames per second
+FRAME_INTERVAL_MS = 33
+
+# Lines kept in the status log, the oldest ones are dropped beyond that
+STATUS_LOG_LINES = 1000
+
+# Milliseconds without typing before a category or extension filter is applied
+FILTER_DELAY_MS = 150
 
 
 def resource_path(relative_path):
@@ -21,6 +42,142 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+class VirtualList(ctk.CTkFrame):
+    def __init__(self, master, on_select, row_height: int = 30, **kwargs):
+        """
+        Scrollable list of strings rendering only the rows that are visible.
+
+        A small pool of row buttons is created once and relabelled as the list scrolls, so the
+        cost of a refresh depends on the height of the list, not on the number of items.
+
+        Args:
+            master: Parent widget
+            on_select (Callable): Called with the item of a clicked row
+            row_height (int): Height of a row in pixels
+        """
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.row_height = row_height
+        self.items: List[str] = []
+        # Items matching the filter, the ones that can be scrolled through
+        self.visible_items: List[str] = []
+        self.filter_text = ""
+        self.selected = None
+        self.top = 0
+        self.rows: List[ctk.CTkButton] = []
+        self.row_count = 1
+
+        # Keep the size given by width and height, rows are fitted to it
+        self.grid_propagate(False)
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.rows_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=0, column=0, sticky="nsew")
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.rows_frame.bind("<Configure>", self.on_resize)
+        self.bind_scroll_wheel(self.rows_frame)
+
+    def bind_scroll_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_to(self.top + (-1 if e.delta > 0 else 1)))
+        widget.bind("<Button-4>", lambda e: self.scroll_to(self.top - 1))
+        widget.bind("<Button-5>", lambda e: self.scroll_to(self.top + 1))
+
+    def on_resize(self, event):
+        """Fit the number of rows to the height of the list, growing the pool when needed."""
+        self.row_count = max(1, event.height // self.row_height)
+        while len(self.rows) < self.row_count:
+            index = len(self.rows)
+            row = ctk.CTkButton(
+                self.rows_frame,
+                text="",
+                anchor="w",
+                height=self.row_height - 2,
+                corner_radius=5,
+                fg_color="transparent",
+                text_color=("gray10", "gray90"),  # Dark in light theme, light in dark theme
+                command=lambda i=index: self.on_row_click(i)
+            )
+            self.bind_scroll_wheel(row)
+            self.rows.append(row)
+        self.render()
+
+    def on_row_click(self, index: int):
+        if self.top + index < len(self.visible_items):
+            self.select(self.visible_items[self.top + index])
+            self.on_select(self.selected)
+
+    def on_scrollbar(self, command, value, unit=None):
+        if command == "moveto":
+            self.scroll_to(int(float(value) * len(self.visible_items)))
+        else:
+            step = self.row_count if unit == "pages" else 1
+            self.scroll_to(self.top + int(float(value)) * step)
+
+    def scroll_to(self, top: int):
+        self.top = max(0, min(top, len(self.visible_items) - self.row_count))
+        self.render()
+
+    def render(self):
+        """Relabel the row pool with the items at the current scroll position."""
+        for index, row in enumerate(self.rows):
+            position = self.top + index
+            if index < self.row_count and position < len(self.visible_items):
+                item = self.visible_items[position]
+                row.configure(text=item,
+                              fg_color=("gray75", "gray25") if item == self.selected else "transparent")
+                row.grid(row=index, column=0, sticky="ew", pady=(0, 2))
+            else:
+                row.grid_remove()
+
+        if self.visible_items:
+            self.scrollbar.set(self.top / len(self.visible_items),
+                               min(1.0, (self.top + self.row_count) / len(self.visible_items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def matches(self, item: str) -> bool:
+        return self.filter_text in item.lower()
+
+    def set_items(self, items):
+        """Show new items, keeping the current filter."""
+        self.items = list(items)
+        self.selected = None
+        self.set_filter(self.filter_text)
+
+    def set_filter(self, text: str):
+        """Show only the items containing text, ignoring case."""
+        self.filter_text = text.strip().lower()
+        self.visible_items = [item for item in self.items if self.matches(item)] if self.filter_text else self.items
+        self.scroll_to(0)
+
+    def select(self, item: str | None):
+        self.selected = item
+        self.render()
+
+    def insert_item(self, item: str):
+        """Add an item at the end and scroll to it if it is shown."""
+        self.items.append(item)
+        if self.visible_items is not self.items and self.matches(item):
+            self.visible_items.append(item)
+        if self.matches(item):
+            self.scroll_to(len(self.visible_items))
+        else:
+            self.render()
+
+    def remove_item(self, item: str):
+        """Remove an item, leaving the scroll position where it is."""
+        if item in self.items:
+            self.items.remove(item)
+        if self.visible_items is not self.items and item in self.visible_items:
+            self.visible_items.remove(item)
+        if item == self.selected:
+            self.selected = None
+        self.scroll_to(self.top)
+
+
 class CategoryManager:
     def __init__(self, root, organizer: FolderOrganizer, status_callback):
         self.root = root
@@ -28,6 +185,7 @@ class CategoryManager:
         self.status_callback = status_callback
         self.current_category = None
         self.current_extension = None
+        self.pending_filters = {}
 
         self.setup_ui()
         self.refresh_categories()
@@ -39,17 +197,21 @@ class CategoryManager:
         # Categories Section
         ctk.CTkLabel(main_frame, text="Categories:").grid(row=0, column=0, sticky="w")
 
-        # Category Listbox
-        self.category_list = ctk.CTkScrollableFrame(main_frame, width=200, height=150)
-        self.category_list.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        # Category Filter
+        self.category_filter = ctk.CTkEntry(main_frame, width=200, placeholder_text="Filter categories")
+        self.category_filter.grid(row=1, column=0, padx=5, pady=5)
+
+        # Category Listbox, only the visible rows are rendered
+        self.category_list = VirtualList(main_frame, self.select_category, width=200, height=150)
+        self.category_list.grid(row=2, column=0, padx=5, pady=5, sticky="nsew")
 
         # Category Entry
         self.category_entry = ctk.CTkEntry(main_frame, width=200)
-        self.category_entry.grid(row=2, column=0, padx=5, pady=5)
+        self.category_entry.grid(row=3, column=0, padx=5, pady=5)
 
         # Category Buttons
         category_btn_frame = ctk.CTkFrame(main_frame)
-        category_btn_frame.grid(row=3, column=0, pady=5)
+        category_btn_frame.grid(row=4, column=0, pady=5)
         ctk.CTkButton(category_btn_frame, text="Add", width=95, command=self.add_category).grid(row=0, column=0, padx=2)
         ctk.CTkButton(category_btn_frame, text="Remove", width=95, command=self.remove_category).grid(row=0, column=1,
                                                                                                       padx=2)
@@ -57,29 +219,48 @@ class CategoryManager:
         # Extensions Section
         ctk.CTkLabel(main_frame, text="Extensions:").grid(row=0, column=1, sticky="w")
 
-        # Extensions Listbox
-        self.extensions_list = ctk.CTkScrollableFrame(main_frame, width=200, height=150)
-        self.extensions_list.grid(row=1, column=1, padx=5, pady=5, sticky="nsew")
+        # Extension Filter
+        self.extension_filter = ctk.CTkEntry(main_frame, width=200, placeholder_text="Filter extensions")
+        self.extension_filter.grid(row=1, column=1, padx=5, pady=5)
+
+        # Extensions Listbox, only the visible rows are rendered
+        self.extensions_list = VirtualList(main_frame, self.select_extension, width=200, height=150)
+        self.extensions_list.grid(row=2, column=1, padx=5, pady=5, sticky="nsew")
 
         # Extension Entry
         self.extension_entry = ctk.CTkEntry(main_frame, width=200)
-        self.extension_entry.grid(row=2, column=1, padx=5, pady=5)
+        self.extension_entry.grid(row=3, column=1, padx=5, pady=5)
 
         # Extension Buttons
         extension_btn_frame = ctk.CTkFrame(main_frame)
-        extension_btn_frame.grid(row=3, column=1, pady=5)
+        extension_btn_frame.grid(row=4, column=1, pady=5)
         ctk.CTkButton(extension_btn_frame, text="Add", width=95, command=self.add_extension).grid(row=0, column=0,
                                                                                                   padx=2)
         ctk.CTkButton(extension_btn_frame, text="Remove", width=95, command=self.remove_extension).grid(row=0, column=1,
                                                                                                         padx=2)
 
         # Configure grid weights
-        main_frame.grid_rowconfigure(1, weight=1)
+        main_frame.grid_rowconfigure(2, weight=1)
         main_frame.grid_columnconfigure(0, weight=1)
         main_frame.grid_columnconfigure(1, weight=1)
 
-        # Bind selection events
-        self.bind_selection_events()
+        # Filter as the user types
+        self.category_filter.bind("<KeyRelease>",
+                                  lambda e: self.schedule_filter(self.category_list, self.category_filter))
+        self.extension_filter.bind("<KeyRelease>",
+                                   lambda e: self.schedule_filter(self.extensions_list, self.extension_filter))
+
+    def schedule_filter(self, virtual_list: VirtualList, entry):
+        """Filter a list once the user pauses typing, rather than on every key."""
+        pending = self.pending_filters.pop(virtual_list, None)
+        if pending is not None:
+            self.root.after_cancel(pending)
+        self.pending_filters[virtual_list] = self.root.after(
+            FILTER_DELAY_MS, lambda: self.apply_filter(virtual_list, entry))
+
+    def apply_filter(self, virtual_list: VirtualList, entry):
+        self.pending_filters.pop(virtual_list, None)
+        virtual_list.set_filter(entry.get())
 
     def refresh_ui(self):
         """Refresh all UI elements with current theme settings."""
@@ -94,67 +275,23 @@ class CategoryManager:
         self.category_entry.configure(text_color=ctk.ThemeManager.theme["CTkEntry"]["text_color"])
         self.extension_entry.configure(text_color=ctk.ThemeManager.theme["CTkEntry"]["text_color"])
 
-    def bind_selection_events(self):
-        # Bind category selection
-        for child in self.category_list.winfo_children():
-            if isinstance(child, ctk.CTkButton):
-                child.bind("<Button-1>", lambda e, btn=child: self.select_category(btn.cget("text")))
-
-        # Bind extension selection
-        for child in self.extensions_list.winfo_children():
-            if isinstance(child, ctk.CTkLabel):
-                child.bind("<Button-1>", lambda e, lbl=child: self.select_extension(lbl.cget("text")))
-
     def refresh_categories(self):
         """Refresh the list of categories."""
-        # Clear existing widgets
-        for widget in self.category_list.winfo_children():
-            widget.destroy()
-
-        # Add new category buttons with theme-adaptive colors
-        for category in self.organizer.get_extension_maps():
-            btn = ctk.CTkButton(
-                self.category_list,
-                text=category,
-                anchor="w",
-                corner_radius=5,
-                fg_color="transparent",
-                text_color=("gray10", "gray90")  # Dark in light theme, light in dark theme
-            )
-            btn.pack(fill="x", pady=2)
-            btn.bind("<Button-1>", lambda e, c=category: self.select_category(c))
-
+        self.category_list.set_items(self.organizer.get_categories())
+        self.category_list.select(self.current_category)
         self.refresh_extensions()
 
     def refresh_extensions(self):
         """Refresh the list of extensions for the selected category."""
-        for widget in self.extensions_list.winfo_children():
-            widget.destroy()
-
         if self.current_category:
-            extensions = self.organizer.get_extension_maps().get(self.current_category, [])
-            for ext in extensions:
-                btn = ctk.CTkButton(
-                    self.extensions_list,
-                    text=ext,
-                    anchor="w",
-                    corner_radius=5,
-                    fg_color="transparent",
-                    text_color=("gray10", "gray90")
-                )
-                btn.pack(fill="x", pady=2)
-
-                # Use a helper function to capture the extension
-                def make_handler(extension):
-                    return lambda e: self.select_extension(extension)
-
-                btn.bind("<Button-1>", make_handler(ext))
-
-        self.bind_selection_events()
+            self.extensions_list.set_items(self.organizer.get_category_extensions(self.current_category))
+        else:
+            self.extensions_list.set_items([])
 
     def select_category(self, category: str):
         """Select a category and show its extensions."""
         self.current_category = category
+        self.category_list.select(category)
         self.category_entry.delete(0, "end")
         self.category_entry.insert(0, category)
         self.refresh_extensions()
@@ -162,6 +299,7 @@ class CategoryManager:
     def select_extension(self, extension: str):
         """Select an extension."""
         self.current_extension = extension
+        self.extensions_list.select(extension)
         self.extension_entry.delete(0, "end")
         self.extension_entry.insert(0, extension)
 
@@ -172,13 +310,13 @@ class CategoryManager:
             messagebox.showerror("Error", "Please enter a category name!")
             return
 
-        if new_category in self.organizer.get_extension_maps():
+        if new_category in self.organizer.get_categories():
             messagebox.showerror("Error", "Category already exists!")
             return
 
         self.organizer.add_extension_category(new_category, [])
         self.category_entry.delete(0, "end")
-        self.refresh_categories()
+        self.category_list.insert_item(new_category)
         self.status_callback(f"Added category: {new_category}")
 
     def remove_category(self):
@@ -190,8 +328,9 @@ class CategoryManager:
 
         self.organizer.remove_category(category_to_remove)
         self.category_entry.delete(0, "end")
+        self.category_list.remove_item(category_to_remove)
         self.current_category = None
-        self.refresh_categories()
+        self.refresh_extensions()
         self.status_callback(f"Removed category: {category_to_remove}")
 
     def add_extension(self):
@@ -209,16 +348,13 @@ class CategoryManager:
             return
 
         # Check for duplicate in current category
-        current_extensions = self.organizer.get_extension_maps().get(self.current_category, [])
-        if new_ext in current_extensions:
+        if new_ext in self.organizer.get_category_extensions(self.current_category):
             messagebox.showerror("Error", f"Extension {new_ext} already exists in this category!")
             return
 
         # Check for existence in other categories
-        conflicting_categories = []
-        for category, extensions in self.organizer.get_extension_maps().items():
-            if category != self.current_category and new_ext in extensions:
-                conflicting_categories.append(category)
+        conflicting_categories = [category for category in self.organizer.get_categories_with_extension(new_ext)
+                                  if category != self.current_category]
 
         if conflicting_categories:
             conflict_list = "\n- ".join(conflicting_categories)
@@ -232,7 +368,7 @@ class CategoryManager:
         # Add the extension if all checks pass
         self.organizer.add_extensions_to_category(self.current_category, [new_ext])
         self.extension_entry.delete(0, "end")
-        self.refresh_extensions()
+        self.extensions_list.insert_item(new_ext)
         self.status_callback(f"Added extension {new_ext} to {self.current_category}")
 
     def remove_extension(self):
@@ -245,12 +381,10 @@ class CategoryManager:
         if not ext_to_remove.startswith('.'):
             ext_to_remove = '.' + ext_to_remove
 
-        current_extensions = self.organizer.get_extension_maps().get(self.current_category, [])
-        if ext_to_remove in current_extensions:
-            current_extensions.remove(ext_to_remove)
-            self.organizer.add_extension_category(self.current_category, current_extensions)
+        if ext_to_remove in self.organizer.get_category_extensions(self.current_category):
+            self.organizer.remove_extensions_from_category(self.current_category, [ext_to_remove])
             self.extension_entry.delete(0, "end")
-            self.refresh_extensions()
+            self.extensions_list.remove_item(ext_to_remove)
             self.status_callback(f"Removed extension {ext_to_remove} from {self.current_category}")
         else:
             messagebox.showerror("Error", "Extension not found in category!")
@@ -259,7 +393,7 @@ class FileOrganizerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("File Organizer")
-        self.root.geometry("800x600")
+        self.root.geometry("800x660")
 
         # Set the window icon
         icon_path = resource_path("assets/icon.ico")
@@ -272,17 +406,40 @@ class FileOrganizerGUI:
         self.is_dark_theme = True
         ctk.set_appearance_mode("dark")  # Default to dark theme
 
-        # Create the organizer instance
-        self.organizer = FolderOrganizer()
+        # Create the organizer instance, with an undo history that survives restarts, and move limits
+        # that can be changed while it runs
+        self.rate_limiter = RateLimiter(target_latency=0.05)
+        self.organizer = FolderOrganizer(move_engine=MoveEngine(rate_limiter=self.rate_limiter))
+        try:
+            journal = MoveJournal(JOURNAL_PATH)
+            journal.compact()
+            self.organizer.use_journal(journal)
+        except OSError as e:
+            print(f"Undo journal unavailable, undo history will not be kept: {e}")
 
         # Create main frame
         self.main_frame = ctk.CTkFrame(self.root, corner_radius=10)
         self.main_frame.pack(padx=10, pady=10, fill="both", expand=True)
 
+        # Plan shown by the last preview, reused by the next organization of the same directory
+        self.previewed_plan = None
+
+        # Organize and undo run on a worker thread, which hands its events to the window through this queue
+        self.worker = None
+        self.worker_queue = queue.Queue()
+        self.worker_callbacks = None
+        self.progress = None
+        # Set by the Cancel button, the organizer stops between two chunks of files
+        self.cancel_event = threading.Event()
+        self.status_line_count = 0
+
         # Set up the GUI elements
         self.setup_gui()
         self.management_window = None  # Track category management window
 
+        # Let a running operation stop cleanly before the window goes away
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def setup_gui(self):
         # Theme Toggle Button
         self.theme_button = ctk.CTkButton(
@@ -313,11 +470,21 @@ class FileOrganizerGUI:
         button_frame = ctk.CTkFrame(self.main_frame, corner_radius=10)
         button_frame.grid(row=2, column=0, columnspan=2, pady=10)
 
-        ctk.CTkButton(button_frame, text="Organize Files",
-                      command=self.organize_files, corner_radius=5).grid(row=0, column=0, padx=5)
+        self.organize_button = ctk.CTkButton(button_frame, text="Organize Files",
+                                             command=self.organize_files, corner_radius=5)
+        self.organize_button.grid(row=0, column=0, padx=5)
+
+        self.preview_button = ctk.CTkButton(button_frame, text="Preview",
+                                            command=self.preview_organization, corner_radius=5)
+        self.preview_button.grid(row=0, column=1, padx=5)
+
+        self.undo_button = ctk.CTkButton(button_frame, text="Undo",
+                                         command=self.undo_organization, corner_radius=5)
+        self.undo_button.grid(row=0, column=2, padx=5)
 
-        ctk.CTkButton(button_frame, text="Undo",
-                      command=self.undo_organization, corner_radius=5).grid(row=0, column=1, padx=5)
+        self.cancel_button = ctk.CTkButton(button_frame, text="Cancel", state="disabled",
+                                           command=self.cancel_operation, corner_radius=5)
+        self.cancel_button.grid(row=0, column=3, padx=5)
 
         # Status Text
         self.status_text = ctk.CTkTextbox(self.main_frame, height=300, width=700, corner_radius=5)
@@ -337,12 +504,43 @@ class FileOrganizerGUI:
         control_frame = ctk.CTkFrame(self.main_frame, corner_radius=10)
         control_frame.grid(row=5, column=0, columnspan=2, pady=10)
 
-        ctk.CTkButton(control_frame, text="Manage Categories",
-                      command=self.open_management_window, corner_radius=5).grid(row=0, column=0, padx=5)
+        self.manage_button = ctk.CTkButton(control_frame, text="Manage Categories",
+                                           command=self.open_management_window, corner_radius=5)
+        self.manage_button.grid(row=0, column=0, padx=5)
         ctk.CTkButton(control_frame, text="Save Maps",
                       command=self.save_maps, corner_radius=5).grid(row=0, column=1, padx=5)
-        ctk.CTkButton(control_frame, text="Load Maps",
-                      command=self.load_maps, corner_radius=5).grid(row=0, column=2, padx=5)
+        self.load_button = ctk.CTkButton(control_frame, text="Load Maps",
+                                         command=self.load_maps, corner_radius=5)
+        self.load_button.grid(row=0, column=2, padx=5)
+
+        # Move limits, applied right away even to a running operation
+        limit_frame = ctk.CTkFrame(self.main_frame, corner_radius=10)
+        limit_frame.grid(row=6, column=0, columnspan=2, pady=10)
+
+        ctk.CTkLabel(limit_frame, text="Max files/s:").grid(row=0, column=0, padx=5)
+        self.max_ops_entry = ctk.CTkEntry(limit_frame, width=80, placeholder_text="No limit")
+        self.max_ops_entry.grid(row=0, column=1, padx=5)
+        ctk.CTkLabel(limit_frame, text="Max MB/s:").grid(row=0, column=2, padx=5)
+        self.max_bandwidth_entry = ctk.CTkEntry(limit_frame, width=80, placeholder_text="No limit")
+        self.max_bandwidth_entry.grid(row=0, column=3, padx=5)
+        ctk.CTkButton(limit_frame, text="Apply Limits",
+                      command=self.apply_limits, corner_radius=5).grid(row=0, column=4, padx=5)
+
+        # Buttons starting work that must not overlap a running operation
+        self.operation_buttons = [self.organize_button, self.preview_button, self.undo_button,
+                                  self.manage_button, self.load_button]
+
+    def apply_limits(self):
+        """Limit the moves per second and the megabytes copied per second, an empty field removing a limit."""
+        try:
+            max_ops = float(self.max_ops_entry.get()) if self.max_ops_entry.get().strip() else None
+            max_bandwidth = float(self.max_bandwidth_entry.get()) if self.max_bandwidth_entry.get().strip() else None
+            self.rate_limiter.set_limits(max_ops, None if max_bandwidth is None else max_bandwidth * 1024 * 1024)
+        except ValueError:
+            messagebox.showerror("Error", "Limits must be positive numbers!")
+            return
+        self.update_status(f"Limits: {max_ops or 'no limit'} files/s, "
+                           f"{max_bandwidth or 'no limit'} MB/s")
 
     def open_management_window(self):
         """Open the category management window."""
@@ -351,6 +549,9 @@ class FileOrganizerGUI:
             self.management_window.focus()
             return
 
+        # Category changes make a previewed plan stale
+        self.previewed_plan = None
+
         self.management_window = ctk.CTkToplevel(self.root)
         self.management_window.title("Manage Categories")
         self.management_window.geometry("600x500")
@@ -407,6 +608,7 @@ class FileOrganizerGUI:
             with open(file_path, 'r') as f:
                 new_maps = json.load(f)
             self.organizer.set_extension_maps(new_maps)
+            self.previewed_plan = None
             self.update_status(f"Extension maps loaded from {file_path}")
             messagebox.showinfo("Success", "Extension maps loaded successfully!")
         except Exception as e:
@@ -437,34 +639,128 @@ class FileOrganizerGUI:
             self.directory_var.set(directory)
 
     def update_status(self, message):
-        self.status_text.insert("end", message + "\n")
+        self.append_status([message])
+
+    def append_status(self, lines):
+        """Append lines to the status log, dropping the oldest ones beyond STATUS_LOG_LINES."""
+        text = "\n".join(deque(lines, maxlen=STATUS_LOG_LINES))
+        self.status_text.insert("end", text + "\n")
+        self.status_line_count += text.count("\n") + 1
+
+        excess = self.status_line_count - STATUS_LOG_LINES
+        if excess > 0:
+            self.status_text.delete("1.0", f"{excess + 1}.0")
+            self.status_line_count -= excess
         self.status_text.see("end")
-        self.root.update()
 
     class GUIProgress:
         def __init__(self, gui, total_files):
             self.gui = gui
             self.counter = 0
             self.total = total_files
-            self.original_move = shutil.move
-
-        def custom_print(self, message):
-            self.gui.update_status(message)
-
-        def custom_move(self, src, dst):
-            self.original_move(src, dst)
-            self.counter += 1
-            progress = (self.counter / self.total)
-            self.gui.progress_var.set(progress)
-            self.gui.root.update()
-
-    def setup_progress_handling(self, total_files: int) -> tuple:
-        progress_handler = self.GUIProgress(self, total_files)
-        original_print = builtins.print
-        original_move = shutil.move
-        builtins.print = progress_handler.custom_print
-        shutil.move = progress_handler.custom_move
-        return original_print, original_move
+
+        def on_events(self, events: list):
+            """Show the events received during a frame with a single textbox insert."""
+            # Only the lines that stay in the status log are formatted
+            lines = deque(maxlen=STATUS_LOG_LINES)
+            for event in events:
+                if isinstance(event, (FileMoved, OperationError)):
+                    self.counter += 1
+                elif isinstance(event, PhaseFinished) and event.phase == 'scan':
+                    # Planning on the worker thread tells how many files there are
+                    self.total = event.files
+                line = format_event(event)
+                if line is not None:
+                    lines.append(line)
+
+            if lines:
+                self.gui.append_status(lines)
+            if self.total:
+                self.gui.progress_var.set(self.counter / self.total)
+
+    def start_operation(self, message: str, total_files: int, work, on_done, error_message: str):
+        """
+        Run a preview, organize or undo on a worker thread, keeping the window responsive.
+
+        The organizer's events are batched by a BatchingSink and queued for the window, which drains the
+        queue once per frame. on_done is called on the GUI thread with the result of work.
+        """
+        self.set_busy(True)
+        self.cancel_event = threading.Event()
+        self.progress_var.set(0)
+        self.update_status(message)
+
+        self.progress = self.GUIProgress(self, total_files)
+        sink = BatchingSink(lambda events: self.worker_queue.put(('events', events)), interval=PROGRESS_INTERVAL)
+        self.organizer.event_sink = sink
+
+        def run():
+            try:
+                result = work()
+                sink.flush()
+                self.worker_queue.put(('done', result))
+            except Exception as e:
+                sink.flush()
+                self.worker_queue.put(('error', e))
+
+        self.worker_callbacks = (on_done, error_message)
+        self.worker = threading.Thread(target=run, name="organizer-worker", daemon=True)
+        self.worker.start()
+        self.root.after(FRAME_INTERVAL_MS, self.process_worker_queue)
+
+    def process_worker_queue(self):
+        """Show what the worker reported since the last frame, until it is done."""
+        events = []
+        outcome = None
+        while True:
+            try:
+                kind, value = self.worker_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'events':
+                events.extend(value)
+            else:
+                outcome = (kind, value)
+
+        if events:
+            self.progress.on_events(events)
+        if outcome is None:
+            self.root.after(FRAME_INTERVAL_MS, self.process_worker_queue)
+            return
+
+        self.worker.join()
+        self.worker = None
+        self.organizer.event_sink = None
+        self.progress_var.set(0)
+        self.set_busy(False)
+
+        on_done, error_message = self.worker_callbacks
+        kind, value = outcome
+        if kind == 'error':
+            messagebox.showerror("Error", f"{error_message}: {str(value)}")
+        else:
+            on_done(value)
+
+    def set_busy(self, busy: bool):
+        """Disable the buttons starting new work while an operation runs, and enable Cancel."""
+        for button in self.operation_buttons:
+            button.configure(state="disabled" if busy else "normal")
+        self.cancel_button.configure(state="normal" if busy else "disabled")
+
+    def cancel_operation(self):
+        """Stop the running operation after the files being moved right now."""
+        if self.worker is None:
+            return
+        self.cancel_event.set()
+        self.cancel_button.configure(state="disabled")
+        self.update_status("Cancelling...")
+
+    def on_close(self):
+        """Close the window, waiting for a running operation to stop so that its undo history is complete."""
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.worker.join()
+        self.root.destroy()
 
     def validate_directory(self) -> bool:
         directory = self.directory_var.get()
@@ -476,63 +772,79 @@ class FileOrganizerGUI:
             return False
         return True
 
-    def get_file_list(self, directory: str) -> list:
-        files = [f for f in os.listdir(directory)
-                 if os.path.isfile(os.path.join(directory, f))
-                 and not f.startswith('.')]
-        if not files:
-            self.update_status("No files to organize!")
-        return files
-
-    def organize_files(self):
+    def preview_organization(self):
         if not self.validate_directory():
             return
 
         directory = self.directory_var.get()
-        files = self.get_file_list(directory)
 
-        if not files:
-            return
+        def work() -> OrganizePlan:
+            # Sizes cost a stat per file, too slow for the GUI thread on large folders
+            return self.organizer.plan_organization(directory)
 
-        self.progress_var.set(0)
-        self.update_status("Starting organization...")
+        def on_done(plan: OrganizePlan):
+            if self.cancel_event.is_set():
+                self.update_status("Preview cancelled.")
+                return
+            if not plan:
+                self.update_status("No files to organize!")
+                return
 
-        try:
-            # Setup progress handling
-            original_print, original_move = self.setup_progress_handling(len(files))
-            self.organizer.organize_folder(directory)
-            self.update_status("\nOrganization complete!")
+            self.update_status(f"Preview of {plan.directory}:")
+            for category, (count, size) in sorted(plan.summary().items()):
+                self.update_status(f"  {category}: {count} files, {size / (1024 * 1024):.1f} MB")
+            self.update_status(f"{len(plan)} files will be organized.")
+            self.previewed_plan = plan
 
-            # Restore original functions
-            builtins.print = original_print
-            shutil.move = original_move
+        self.start_operation("Planning organization...", 0, work, on_done, "An error occurred during preview")
 
-            messagebox.showinfo("Success", "Files have been organized successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-        finally:
-            self.progress_var.set(0)
+    def organize_files(self):
+        if not self.validate_directory():
+            return
 
-    def undo_organization(self):
-        self.update_status("Starting undo process...")
+        directory = self.directory_var.get()
+        # Reuse the previewed plan if it is for this directory, otherwise plan on the worker thread
+        plan = self.previewed_plan
+        self.previewed_plan = None
+        if plan is not None and plan.directory != os.path.abspath(directory):
+            plan = None
+
+        def work() -> OrganizePlan:
+            current_plan = self.organizer.plan_organization(directory, with_sizes=False) if plan is None else plan
+            if current_plan:
+                self.organizer.execute_plan(current_plan, cancel_event=self.cancel_event)
+            return current_plan
+
+        def on_done(current_plan: OrganizePlan):
+            if not current_plan:
+                self.update_status("No files to organize!")
+            elif self.cancel_event.is_set():
+                self.update_status("\nOrganization cancelled, the files moved so far can be undone.")
+            else:
+                self.update_status("\nOrganization complete!")
+                messagebox.showinfo("Success", "Files have been organized successfully!")
 
-        try:
-            # Setup progress handling
-            undo_files = self.organizer.get_move_history()
-            original_print, original_move = self.setup_progress_handling(len(undo_files))
-            self.organizer.undo_last_operation()
-            self.update_status("\nUndo process complete!")
+        self.start_operation("Starting organization...", len(plan) if plan is not None else 0,
+                             work, on_done, "An error occurred")
+
+    def undo_organization(self):
+        undo_count = len(self.organizer.get_move_history())
 
-            # Restore original functions
-            builtins.print = original_print
-            shutil.move = original_move
+        def on_done(_):
+            if self.cancel_event.is_set():
+                self.update_status("\nUndo cancelled, undo again to move the remaining files back.")
+                return
 
-            if len(undo_files) > 0:
+            self.update_status("\nUndo process complete!")
+            if undo_count > 0:
                 messagebox.showinfo("Success", "Files have been moved back to their original locations!")
             else:
                 messagebox.showwarning("Warning", "Undo operation did not move any file!")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred during undo: {str(e)}")
+
+        def work():
+            self.organizer.undo_last_operation(cancel_event=self.cancel_event)
+
+        self.start_operation("Starting undo process...", undo_count, work, on_done, "An error occurred during undo")
 
 def main():
     root = ctk.CTk()
@@ -0,0 +1,163 @@
+import errno
+import hashlib
+import os
+import shutil
+import time
+from typing import Callable
+from rateLimiter import BUSY_ERRNOS, RateLimiter
+
+# Errors meaning a kernel copy primitive can't be used for this pair of files
+_UNSUPPORTED_COPY_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+class MoveEngine:
+    def __init__(self, chunk_size: int = 64 * 1024 * 1024, verify: str | None = None,
+                 progress_callback: Callable[[str, int, int], None] | None = None,
+                 rate_limiter: RateLimiter | None = None):
+        """
+        Move files with a rename, falling back to a streaming copy when the destination is on another device.
+
+        Args:
+            chunk_size (int): Number of bytes copied per kernel call (or per read) on cross-device moves
+            verify (str | None): Check done before deleting the source of a copy: None, 'size' or 'checksum'
+            progress_callback (Callable | None): Called with (source path, bytes copied, total bytes) while copying
+            rate_limiter (RateLimiter | None): Limits of the moves per second and of the bytes copied per second
+        """
+        if verify not in (None, 'size', 'checksum'):
+            raise ValueError(f"Unknown verification mode: {verify}")
+
+        self.chunk_size = chunk_size
+        self.verify = verify
+        self.progress_callback = progress_callback
+        self.rate_limiter = rate_limiter
+
+    def move(self, source_path: str, destination_path: str) -> None:
+        """Move a file, renaming it in place when both paths are on the same filesystem."""
+        if self.rate_limiter is not None:
+            self._limited_move(source_path, destination_path)
+            return
+        try:
+            os.rename(source_path, destination_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            self.move_across_devices(source_path, destination_path)
+
+    def _limited_move(self, source_path: str, destination_path: str) -> None:
+        """Move a file once the rate limiter allows it, reporting how long the rename took."""
+        self.rate_limiter.acquire_operation()
+        start_time = time.perf_counter()
+        try:
+            os.rename(source_path, destination_path)
+        except OSError as e:
+            if e.errno in BUSY_ERRNOS:
+                self.rate_limiter.record_busy()
+            if e.errno != errno.EXDEV:
+                raise
+            # Copies are limited by their bytes, their duration says nothing about the storage's load
+            self.move_across_devices(source_path, destination_path)
+            return
+        try:
+            self.rate_limiter.record_latency(time.perf_counter() - start_time)
+        except Exception:
+            # The file is moved, throttling must never turn a completed move into an error
+            pass
+
+    def move_across_devices(self, source_path: str, destination_path: str) -> None:
+        """Copy a file with its metadata to another filesystem, then delete the source."""
+        if os.path.islink(source_path):
+            # Recreate the link itself rather than copying what it points to
+            os.symlink(os.readlink(source_path), destination_path)
+            os.unlink(source_path)
+            return
+
+        if os.path.isdir(source_path):
+            shutil.move(source_path, destination_path)
+            return
+
+        try:
+            self.copy_file(source_path, destination_path)
+            shutil.copystat(source_path, destination_path)
+            self.verify_copy(source_path, destination_path)
+        except BaseException:
+            # Never leave a partial copy behind, the source is still intact
+            try:
+                os.unlink(destination_path)
+            except OSError:
+                pass
+            raise
+
+        os.unlink(source_path)
+
+    def copy_file(self, source_path: str, destination_path: str) -> int:
+        """
+        Copy file contents using copy_file_range or sendfile when available. Returns the number of bytes copied.
+
+        Kernel copies can stop early on some filesystems, like procfs, FUSE or network ones: a method that copies
+        nothing, or stops before the size of the source, hands over to the next one, and a copy still short
+        after plain reads raises an OSError, so the source is never deleted after a partial copy.
+        """
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            total = os.fstat(source.fileno()).st_size
+            copied = 0
+            chunk_size = self.chunk_size if self.rate_limiter is None else self.rate_limiter.copy_chunk_size(
+                self.chunk_size)
+
+            for copy_chunk in (self._copy_file_range_chunk, self._sendfile_chunk, self._read_write_chunk):
+                method_start = copied
+                try:
+                    while True:
+                        count = copy_chunk(source, destination, copied, chunk_size)
+                        if count == 0:
+                            if copied > method_start and copied >= total:
+                                return copied
+                            break
+                        copied += count
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.acquire_bytes(count)
+                        if self.progress_callback is not None:
+                            self.progress_callback(source_path, copied, total)
+                except (OSError, AttributeError) as e:
+                    # Fall back to the next method only if this one never worked for these files
+                    if copied or (isinstance(e, OSError) and e.errno not in _UNSUPPORTED_COPY_ERRNOS):
+                        raise
+
+            if copied < total:
+                raise OSError(errno.EIO, f"Copy stopped after {copied} of {total} bytes", source_path)
+            return copied
+
+    @staticmethod
+    def _copy_file_range_chunk(source, destination, offset: int, size: int) -> int:
+        return os.copy_file_range(source.fileno(), destination.fileno(), size, offset, offset)
+
+    @staticmethod
+    def _sendfile_chunk(source, destination, offset: int, size: int) -> int:
+        return os.sendfile(destination.fileno(), source.fileno(), offset, size)
+
+    @staticmethod
+    def _read_write_chunk(source, destination, offset: int, size: int) -> int:
+        source.seek(offset)
+        destination.seek(offset)
+        data = source.read(min(size, 16 * 1024 * 1024))
+        destination.write(data)
+        destination.flush()
+        return len(data)
+
+    def verify_copy(self, source_path: str, destination_path: str) -> None:
+        """Raise an OSError if the copy doesn't match the source according to the verification mode."""
+        if self.verify is None:
+            return
+
+        if os.path.getsize(source_path) != os.path.getsize(destination_path):
+            raise OSError(errno.EIO, "Copied file size does not match the source", destination_path)
+
+        if self.verify == 'checksum' and self.file_checksum(source_path) != self.file_checksum(destination_path):
+            raise OSError(errno.EIO, "Copied file checksum does not match the source", destination_path)
+
+    def file_checksum(self, path: str) -> str:
+        """Compute the BLAKE2b digest of a file."""
+        digest = hashlib.blake2b()
+        with open(path, 'rb') as f:
+            while chunk := f.read(min(self.chunk_size, 16 * 1024 * 1024)):
+                digest.update(chunk)
+        return digest.hexdigest()
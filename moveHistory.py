@@ -0,0 +1,74 @@
+import os
+from array import array
+from typing import Dict, Iterator, List, Tuple
+from nameBuffer import NameBuffer
+
+
+class MoveHistory:
+    def __init__(self, directory: str):
+        """
+        Compact in-memory record of the (destination, original) moves of one operation.
+
+        The operation directory is stored once, folders (category folders, or subfolders for
+        recursive runs) are interned and referenced by id, and file names are packed in a NameBuffer.
+        """
+        self.directory = directory
+        self.folders: List[str] = []
+        self._folder_ids: Dict[str, int] = {}
+        self.names = NameBuffer()
+        self._source_folders = array('I')
+        self._destination_folders = array('I')
+        # Destination names differing from the source name, only for renamed files
+        self._renamed: Dict[int, str] = {}
+
+    def _folder_id(self, folder: str) -> int:
+        """Intern a folder, stored relative to the operation directory when it's inside it."""
+        if folder == self.directory:
+            folder = ''
+        elif folder.startswith(os.path.join(self.directory, '')):
+            folder = folder[len(self.directory) + 1:]
+
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self._folder_ids[folder] = len(self.folders)
+            self.folders.append(folder)
+        return folder_id
+
+    def append(self, move: Tuple[str, str]) -> None:
+        """Record a (destination, original) move."""
+        destination_folder, destination_name = os.path.split(move[0])
+        source_folder, source_name = os.path.split(move[1])
+
+        if destination_name != source_name:
+            self._renamed[len(self)] = destination_name
+        self.names.append(source_name)
+        self._source_folders.append(self._folder_id(source_folder))
+        self._destination_folders.append(self._folder_id(destination_folder))
+
+    def __len__(self) -> int:
+        return len(self._source_folders)
+
+    def __getitem__(self, index: int) -> Tuple[str, str]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("move history index out of range")
+
+        source_name = self.names[index]
+        destination_name = self._renamed.get(index, source_name)
+        return (os.path.join(self.directory, self.folders[self._destination_folders[index]], destination_name),
+                os.path.join(self.directory, self.folders[self._source_folders[index]], source_name))
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self) -> Iterator[Tuple[str, str]]:
+        for index in range(len(self) - 1, -1, -1):
+            yield self[index]
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the recorded moves, in bytes."""
+        return (self.names.nbytes()
+                + self._source_folders.itemsize * len(self._source_folders)
+                + self._destination_folders.itemsize * len(self._destination_folders))
@@ -0,0 +1,389 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Default journal file, stored inside the organized directory. Hidden files are never organized.
+JOURNAL_FILE_NAME = '.folder_organizer_journal.jsonl'
+
+
+class JournalHistory:
+    def __init__(self, journal: 'MoveJournal', operation_id: int, directory: str, start: int,
+                 end: int | None = None, count: int = 0, identity: Tuple[int, int] | None = None):
+        """
+        Move history of one operation, read back from the journal instead of being held in memory.
+
+        Moves are (destination, original) path pairs, like the in-memory histories.
+        """
+        self.journal = journal
+        self.operation_id = operation_id
+        self.directory = directory
+        # Byte range of the journal holding this operation's records, end is None while it is being written
+        self.start = start
+        self.end = end
+        self.count = count
+        # Device and inode of the journal file the range is in, it changes when the journal is compacted
+        self.identity = identity
+
+    def append(self, move: Tuple[str, str]) -> None:
+        """Record a move of this operation in the journal."""
+        self.journal.record_move(self, move)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self.journal.read_moves(self)
+
+    def __reversed__(self) -> Iterator[Tuple[str, str]]:
+        return self.journal.read_moves(self, reverse=True)
+
+    def __getitem__(self, index: int) -> Tuple[str, str]:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("move history index out of range")
+        for position, move in enumerate(self):
+            if position == index:
+                return move
+        raise IndexError("move history index out of range")
+
+
+class MoveJournal:
+    def __init__(self, file_path: str, sync_every: int = 256):
+        """
+        Append-only journal of organize operations, so undo survives restarts and crashes.
+
+        Every line is a JSON record: an operation begins, records each move as it happens, ends,
+        and is later undone or discarded. Records are written and fsynced every sync_every moves
+        and at the end of each operation, so a crash loses at most one batch of records.
+
+        Several processes can use the same journal: records are written under an exclusive lock
+        on a file next to the journal, operation ids are taken from the records of all of them, and
+        a journal compacted by another process is followed instead of writing to the replaced file.
+
+        Args:
+            file_path (str): The journal file, created if it doesn't exist
+            sync_every (int): Number of move records written between two fsync calls
+        """
+        self.file_path = os.path.abspath(file_path)
+        self.sync_every = sync_every
+        self._lock = threading.Lock()
+        # Records not written yet, appended in a single write under the file lock
+        self._buffer: List[bytes] = []
+
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        # Lock between processes, on a file of its own since compaction replaces the journal
+        self._file_lock = _FileLock(self.file_path + '.lock')
+        self._file = None
+        self._identity = None
+        # Journal size once the records written by other processes were last read, see _catch_up
+        self._known_end = 0
+
+        with self._locked():
+            self._open()
+            # A crash can leave a torn last line, start the next record on a fresh one
+            if self._file.tell() > 0:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        self._file.write(b'\n')
+                        self._file.flush()
+            live, removed = self._read_operations()
+            self._next_id = max((history.operation_id for history in removed + live), default=0) + 1
+            self._known_end = os.fstat(self._file.fileno()).st_size
+
+    @classmethod
+    def next_to(cls, directory: str, sync_every: int = 256, keep: int = 15) -> 'MoveJournal':
+        """Open the journal stored in an organized directory, compacted to its last keep operations."""
+        journal = cls(os.path.join(os.path.abspath(directory), JOURNAL_FILE_NAME), sync_every)
+        journal.compact(keep)
+        return journal
+
+    def close(self) -> None:
+        """Sync and close the journal file."""
+        with self._lock:
+            if not self._file.closed:
+                with self._file_lock:
+                    self._flush(sync=True)
+                self._file.close()
+                self._file_lock.close()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the journal against the other threads and the other processes."""
+        with self._lock, self._file_lock:
+            yield
+
+    def _open(self) -> None:
+        self._file = open(self.file_path, 'ab')
+        file_stat = os.fstat(self._file.fileno())
+        self._identity = (file_stat.st_dev, file_stat.st_ino)
+
+    def _follow_replacement(self) -> None:
+        """Reopen the journal if another process replaced it, compacting it. Must be called with the locks held."""
+        try:
+            file_stat = os.stat(self.file_path)
+            if (file_stat.st_dev, file_stat.st_ino) == self._identity:
+                return
+        except FileNotFoundError:
+            pass
+        self._file.close()
+        self._open()
+        self._known_end = 0
+
+    def _catch_up(self) -> None:
+        """Read the operations begun by other processes, so ids are never reused. Must be called with the locks held."""
+        if os.fstat(self._file.fileno()).st_size <= self._known_end:
+            return
+        with open(self.file_path, 'rb') as f:
+            f.seek(self._known_end)
+            for line in f:
+                record = self._parse(line)
+                if record is not None and record.get('op') == 'begin' and isinstance(record.get('id'), int):
+                    self._next_id = max(self._next_id, record['id'] + 1)
+            self._known_end = f.tell()
+
+    def _flush(self, sync: bool = False) -> None:
+        """Write the buffered records at the end of the journal. Must be called with the locks held."""
+        self._follow_replacement()
+        self._catch_up()
+        if self._buffer:
+            self._file.write(b''.join(self._buffer))
+            self._buffer.clear()
+            self._file.flush()
+            self._known_end = self._file.tell()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def _write(self, record: dict, sync: bool = False) -> int | None:
+        """
+        Buffer a record, writing the buffer when it is full or when sync is set. Returns the journal offset
+        right after the record once it is written, None while it is buffered. Must be called with the lock held.
+        """
+        self._buffer.append(json.dumps(record, separators=(',', ':')).encode('ascii') + b'\n')
+        if not sync and len(self._buffer) < self.sync_every:
+            return None
+        with self._file_lock:
+            self._flush(sync=True)
+            return self._file.tell()
+
+    def begin(self, directory: str) -> JournalHistory:
+        """Start a new operation and return its history."""
+        with self._locked():
+            self._flush()
+            operation_id = self._next_id
+            self._next_id += 1
+            start = self._file.seek(0, os.SEEK_END)
+            # Written before the lock is released, so that no other process takes the same id
+            self._buffer.append(json.dumps({'op': 'begin', 'id': operation_id, 'dir': directory},
+                                           separators=(',', ':')).encode('ascii') + b'\n')
+            self._flush()
+            return JournalHistory(self, operation_id, directory, start, identity=self._identity)
+
+    def record_move(self, history: JournalHistory, move: Tuple[str, str]) -> None:
+        """Append a (destination, original) move to an operation."""
+        destination_path, original_path = move
+        with self._lock:
+            self._write({
+                'op': 'move',
+                'id': history.operation_id,
+                'dst': self._relative(history.directory, destination_path),
+                'src': self._relative(history.directory, original_path),
+            })
+            history.count += 1
+
+    def commit(self, history: JournalHistory) -> None:
+        """End an operation and make all its records durable."""
+        with self._lock:
+            history.end = self._write({'op': 'end', 'id': history.operation_id}, sync=True)
+
+    def mark_undone(self, history: JournalHistory) -> None:
+        """Record that an operation has been undone, it won't be loaded again."""
+        with self._lock:
+            self._write({'op': 'undo', 'id': history.operation_id}, sync=True)
+
+    def discard(self, history: JournalHistory) -> None:
+        """Forget an operation without undoing it."""
+        with self._lock:
+            self._write({'op': 'discard', 'id': history.operation_id}, sync=True)
+
+    def operations(self) -> List[JournalHistory]:
+        """Get the histories of the operations that haven't been undone or discarded, oldest first."""
+        with self._locked():
+            self._flush()
+            return self._read_operations()[0]
+
+    def _read_operations(self) -> Tuple[List[JournalHistory], List[JournalHistory]]:
+        """
+        Read the journal once, keeping only the offsets and counts of each operation. Returns the operations
+        that can still be undone and those undone or discarded. Must be called with the locks held.
+        """
+        histories = {}
+        removed = []
+        offset = 0
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                record = self._parse(line)
+                offset += len(line)
+                if record is None:
+                    continue
+
+                op, operation_id = record.get('op'), record.get('id')
+                if op == 'begin':
+                    histories[operation_id] = JournalHistory(self, operation_id, record['dir'], offset - len(line),
+                                                             identity=self._identity)
+                elif operation_id not in histories:
+                    continue
+                elif op == 'move':
+                    histories[operation_id].count += 1
+                elif op == 'end':
+                    histories[operation_id].end = offset
+                elif op in ('undo', 'discard'):
+                    removed.append(histories.pop(operation_id))
+
+        return list(histories.values()), removed
+
+    def read_moves(self, history: JournalHistory, reverse: bool = False) -> Iterator[Tuple[str, str]]:
+        """Stream the moves of an operation from the journal, in recorded or reverse order."""
+        with self._locked():
+            self._flush()
+            if history.identity != self._identity:
+                self._relocate(history)
+
+        lines = self._read_lines_reversed if reverse else self._read_lines
+        for line in lines(history.start, history.end):
+            record = self._parse(line)
+            if record is not None and record.get('op') == 'move' and record.get('id') == history.operation_id:
+                yield (os.path.join(history.directory, record['dst']),
+                       os.path.join(history.directory, record['src']))
+
+    def _relocate(self, history: JournalHistory) -> None:
+        """Find the records of an operation again in a compacted journal. Must be called with the locks held."""
+        history.start = history.end = 0
+        offset = 0
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                offset += len(line)
+                record = self._parse(line)
+                if record is None or record.get('id') != history.operation_id:
+                    continue
+                if record.get('op') == 'begin':
+                    history.start = offset - len(line)
+                    history.end = None
+                elif record.get('op') == 'end':
+                    history.end = offset
+        history.identity = self._identity
+
+    def _read_lines(self, start: int, end: int | None) -> Iterator[bytes]:
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if end is not None and offset >= end:
+                    break
+                offset += len(line)
+                yield line
+
+    def _read_lines_reversed(self, start: int, end: int | None, block_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Read the lines of a byte range from last to first, one block at a time."""
+        with open(self.file_path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END) if end is None else end
+            remainder = b''
+            while position > start:
+                size = min(block_size, position - start)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b'\n')
+                # The first piece may be the end of a line starting in the previous block
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line
+            if remainder:
+                yield remainder
+
+    @staticmethod
+    def _parse(line: bytes) -> dict | None:
+        try:
+            return json.loads(line)
+        except ValueError:
+            # Torn write from a crash
+            return None
+
+    @staticmethod
+    def _relative(directory: str, path: str) -> str:
+        """Store paths relative to the operation directory to keep records small."""
+        prefix = os.path.join(directory, '')
+        return path[len(prefix):] if path.startswith(prefix) else path
+
+    def compact(self, keep: int = 15) -> None:
+        """
+        Rewrite the journal with only the last operations that can still be undone, when there are others.
+
+        Histories already loaded, in this process or another one, find their records again when read.
+        """
+        temporary_path = self.file_path + '.tmp'
+
+        with self._locked():
+            self._flush(sync=True)
+            histories, removed = self._read_operations()
+            if not removed and len(histories) <= keep:
+                return
+            histories = histories[-keep:] if keep > 0 else []
+
+            with open(temporary_path, 'wb') as f:
+                for history in histories:
+                    for line in self._read_lines(history.start, history.end):
+                        record = self._parse(line)
+                        if record is not None and record.get('id') == history.operation_id:
+                            f.write(line.rstrip(b'\n') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            try:
+                os.replace(temporary_path, self.file_path)
+            except OSError:
+                # Windows refuses to replace a journal another process has open, it is compacted another time
+                os.remove(temporary_path)
+                return
+            self._file.close()
+            self._open()
+            self._known_end = self._file.tell()
+
+
+class _FileLock:
+    def __init__(self, lock_path: str):
+        """Exclusive lock between processes, taken with fcntl.flock, or msvcrt.locking on Windows."""
+        self._file = open(lock_path, 'a+b')
+
+    def __enter__(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            return
+        self._file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after 10 seconds, the lock holder may be compacting a large journal
+                continue
+
+    def __exit__(self, *exc_info) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,53 @@
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List
+
+# Same codec as os.fsencode/os.fsdecode, so any file name round-trips
+_ENCODING = sys.getfilesystemencoding()
+_ERRORS = sys.getfilesystemencodeerrors()
+
+
+class NameBuffer:
+    def __init__(self):
+        """Append-only table of file names packed into a single byte buffer."""
+        # Encoded names are stored back to back, offsets[i] is where name i starts
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    def append(self, name: str) -> int:
+        """Store a name and return its index."""
+        self._data += name.encode(_ENCODING, _ERRORS)
+        self._offsets.append(len(self._data))
+        return len(self._offsets) - 2
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("name index out of range")
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode(_ENCODING, _ERRORS)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def find(self, name: str) -> List[int]:
+        """Get the indexes of every copy of a name, searching the packed bytes instead of decoding each name."""
+        encoded = name.encode(_ENCODING, _ERRORS)
+        indexes = []
+        start = self._data.find(encoded) if encoded else -1
+        while start != -1:
+            # Keep only matches spanning a whole name, not part of a longer one
+            index = bisect_right(self._offsets, start) - 1
+            if self._offsets[index] == start and self._offsets[index + 1] == start + len(encoded):
+                indexes.append(index)
+            start = self._data.find(encoded, start + 1)
+        return indexes
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the buffer, in bytes."""
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
@@ -0,0 +1,138 @@
+import json
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+from nameBuffer import NameBuffer
+
+PLAN_FORMAT = 'folder-organizer-plan'
+PLAN_VERSION = 2
+# Plans written by older versions, still readable
+READABLE_PLAN_VERSIONS = (1, 2)
+
+
+class OrganizePlan:
+    def __init__(self, directory: str, categories: List[str] | None = None):
+        """
+        Files of a directory and the category each one will be moved to, without touching the disk.
+
+        Names are packed in a NameBuffer, categories are stored once and referenced by id,
+        and sizes (-1 when unknown) live in a typed array. Duplicates to replace with hard links
+        map their position to that of the copy kept.
+        """
+        self.directory = directory
+        self.categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self.names = NameBuffer()
+        self.category_ids = array('I')
+        self.sizes = array('q')
+        self.duplicates: Dict[int, int] = {}
+
+        for category in categories or []:
+            self.get_category_id(category)
+
+    def get_category_id(self, category: str) -> int:
+        """Get the id of a category, registering it if it's new to the plan."""
+        category_id = self._category_ids.get(category)
+        if category_id is None:
+            category_id = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def add(self, name: str, category: str, size: int = -1) -> None:
+        """Add a file to the plan."""
+        self.names.append(name)
+        self.category_ids.append(self.get_category_id(category))
+        self.sizes.append(size)
+
+    def __len__(self) -> int:
+        return len(self.category_ids)
+
+    def __getitem__(self, index: int) -> Tuple[str, str, int]:
+        """Get the (name, category, size) of a planned file."""
+        return self.names[index], self.categories[self.category_ids[index]], self.sizes[index]
+
+    def __iter__(self) -> Iterator[Tuple[str, str, int]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def summary(self) -> Dict[str, Tuple[int, int]]:
+        """Get the number of files and known bytes planned for each category."""
+        counts = [0] * len(self.categories)
+        sizes = [0] * len(self.categories)
+        for category_id, size in zip(self.category_ids, self.sizes):
+            counts[category_id] += 1
+            sizes[category_id] += max(size, 0)
+        return {category: (counts[i], sizes[i]) for i, category in enumerate(self.categories) if counts[i]}
+
+    def shard(self, index: int, count: int) -> 'OrganizePlan':
+        """Get the index-th of count contiguous slices of the plan, to execute a large plan in parts."""
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index {index} is out of range for {count} shards")
+
+        start = len(self) * index // count
+        stop = len(self) * (index + 1) // count
+        shard = OrganizePlan(self.directory, self.categories)
+        for position in range(start, stop):
+            shard.names.append(self.names[position])
+        shard.category_ids = self.category_ids[start:stop]
+        shard.sizes = self.sizes[start:stop]
+        # A duplicate is only linked when its kept copy is in the same shard
+        shard.duplicates = {position - start: kept - start for position, kept in self.duplicates.items()
+                            if start <= position < stop and start <= kept < stop}
+        return shard
+
+    def without(self, positions: Iterable[int]) -> 'OrganizePlan':
+        """Get a copy of the plan leaving out the files at the given positions."""
+        removed = set(positions)
+        plan = OrganizePlan(self.directory, self.categories)
+        new_positions = {}
+        for position in range(len(self)):
+            if position not in removed:
+                new_positions[position] = len(plan)
+                plan.names.append(self.names[position])
+                plan.category_ids.append(self.category_ids[position])
+                plan.sizes.append(self.sizes[position])
+        plan.duplicates = {new_positions[position]: new_positions[kept] for position, kept in self.duplicates.items()
+                           if position in new_positions and kept in new_positions}
+        return plan
+
+    def save(self, file_path: str) -> None:
+        """
+        Write the plan as JSON lines: a header line, then one [name, category id, size] line per file.
+
+        Duplicates to link have a fourth item, the position of the copy kept.
+        """
+        with open(file_path, 'w', encoding='utf-8') as f:
+            header = {
+                'format': PLAN_FORMAT,
+                'version': PLAN_VERSION,
+                'directory': self.directory,
+                'categories': self.categories,
+                'count': len(self),
+            }
+            f.write(json.dumps(header) + '\n')
+            for position, (name, category_id, size) in enumerate(zip(self.names, self.category_ids, self.sizes)):
+                line = [name, category_id, size]
+                if position in self.duplicates:
+                    line.append(self.duplicates[position])
+                f.write(json.dumps(line) + '\n')
+
+    @classmethod
+    def load(cls, file_path: str) -> 'OrganizePlan':
+        """Read a plan written by save."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != PLAN_FORMAT or header.get('version') not in READABLE_PLAN_VERSIONS:
+                raise ValueError(f"{file_path} is not a supported organize plan")
+
+            plan = cls(header['directory'], header['categories'])
+            for line in f:
+                name, category_id, size, *kept = json.loads(line)
+                if kept:
+                    plan.duplicates[len(plan)] = kept[0]
+                plan.names.append(name)
+                plan.category_ids.append(category_id)
+                plan.sizes.append(size)
+
+        if len(plan) != header['count']:
+            raise ValueError(f"{file_path} is truncated: expected {header['count']} files, found {len(plan)}")
+        return plan
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+
+class OrganizerEvent:
+    """Base class of the events a FolderOrganizer reports to its event sink."""
+
+
+@dataclass(frozen=True)
+class ScanStarted(OrganizerEvent):
+    directory: str
+
+
+@dataclass(frozen=True)
+class FileClassified(OrganizerEvent):
+    name: str
+    category: str
+
+
+@dataclass(frozen=True)
+class FileMoved(OrganizerEvent):
+    phase: str  # 'organize' or 'undo'
+    source: str
+    destination: str
+    category: str | None = None
+
+
+@dataclass(frozen=True)
+class OperationError(OrganizerEvent):
+    phase: str
+    path: str
+    message: str
+
+
+@dataclass(frozen=True)
+class PhaseFinished(OrganizerEvent):
+    phase: str  # 'scan', 'dedupe', 'organize' or 'undo'
+    files: int
+    errors: int
+    elapsed: float
+
+
+EventSink = Callable[[OrganizerEvent], None]
+
+
+class BatchingSink:
+    def __init__(self, callback: Callable[[List[OrganizerEvent]], None], interval: float = 0.05,
+                 max_events: int = 0):
+        """
+        Event sink coalescing events into batches, so consumers update at their own rate.
+
+        A batch is delivered when interval seconds have passed since the previous one, when max_events
+        events are waiting, and always at the end of a phase. It is safe to emit from several threads,
+        batches are delivered one at a time and in order.
+
+        Args:
+            callback (Callable): Called with each batch of events
+            interval (float): Minimum seconds between two batches, 0 to not limit by time
+            max_events (int): Deliver as soon as this many events are waiting, 0 to not limit by count
+        """
+        self.callback = callback
+        self.interval = interval
+        self.max_events = max_events
+        self._events: List[OrganizerEvent] = []
+        self._last_delivery = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, event: OrganizerEvent) -> None:
+        with self._lock:
+            self._events.append(event)
+            now = time.monotonic()
+            if (isinstance(event, PhaseFinished)
+                    or (self.interval and now - self._last_delivery >= self.interval)
+                    or (self.max_events and len(self._events) >= self.max_events)
+                    or (not self.interval and not self.max_events)):
+                self._deliver(now)
+
+    def flush(self) -> None:
+        """Deliver the waiting events now."""
+        with self._lock:
+            self._deliver(time.monotonic())
+
+    def _deliver(self, now: float) -> None:
+        if self._events:
+            events, self._events = self._events, []
+            self._last_delivery = now
+            self.callback(events)
+
+
+def format_event(event: OrganizerEvent) -> str | None:
+    """Describe an event in a line of text, or None for events that aren't worth a line."""
+    if isinstance(event, FileMoved):
+        if event.phase == 'undo':
+            return f"Moved '{os.path.basename(event.source)}' back to original location"
+        return f"Moved '{os.path.basename(event.source)}' to {event.category} folder"
+    if isinstance(event, OperationError):
+        if event.phase == 'organize':
+            return f"Error moving '{os.path.basename(event.path)}': {event.message}"
+        if event.phase == 'undo':
+            return f"Error undoing move for '{os.path.basename(event.path)}': {event.message}"
+        if event.phase == 'dedupe':
+            return f"Error linking duplicate '{os.path.basename(event.path)}': {event.message}"
+        return f"Error reading '{event.path}': {event.message}"
+    if isinstance(event, PhaseFinished) and event.phase == 'undo' and not event.files and not event.errors:
+        return "No moves to undo."
+    return None
+
+
+def print_event(event: OrganizerEvent) -> None:
+    """Event sink printing a line per move and error, as the command line tools do."""
+    line = format_event(event)
+    if line is not None:
+        print(line)
@@ -0,0 +1,199 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from organizerEvents import OperationError, OrganizerEvent, PhaseFinished, ScanStarted
+
+STATS_FORMAT = 'folder-organizer-stats'
+STATS_VERSION = 1
+
+# Upper bounds in seconds of the move latency histogram buckets, the last bucket counting everything slower
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = 'folder_organizer'
+
+
+class OrganizerStats:
+    def __init__(self, operation: str, directory: str | None = None):
+        """
+        Measurements of a single organize or undo run.
+
+        Phases have two kinds of durations: wall time for the phases running one after the other,
+        and thread time for the work spread over the workers (classifying, moving, listing or creating
+        category folders), summed over every thread, so it can exceed the run's wall time.
+
+        Args:
+            operation (str): 'organize', 'plan' or 'undo'
+            directory (str | None): The directory of the run, when known
+        """
+        self.operation = operation
+        self.directory = directory
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.files = 0
+        self.bytes = 0
+        # Phase -> wall seconds
+        self.phases: Dict[str, float] = {}
+        # Kind of work -> seconds summed over the threads
+        self.thread_seconds: Dict[str, float] = {}
+        # Filesystem call -> number of calls
+        self.syscalls: Counter = Counter()
+        # Phase -> number of errors
+        self.errors: Counter = Counter()
+        # Moves per latency bucket, the last one past LATENCY_BUCKETS[-1]
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self._lock = threading.Lock()
+
+    def record_event(self, event: OrganizerEvent) -> None:
+        """Take the phase durations, moved files and errors from the events the organizer reports."""
+        if isinstance(event, PhaseFinished):
+            self.add_phase(event.phase, event.elapsed)
+            if event.phase in ('organize', 'undo'):
+                with self._lock:
+                    self.files += event.files
+        elif isinstance(event, OperationError):
+            self.add_error(event.phase)
+        elif isinstance(event, ScanStarted) and self.directory is None:
+            self.directory = event.directory
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Add the wall time of a block to a phase."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, time.perf_counter() - start_time)
+
+    def add_thread_time(self, work: str, seconds: float) -> None:
+        with self._lock:
+            self.thread_seconds[work] = self.thread_seconds.get(work, 0.0) + seconds
+
+    def count(self, syscall: str, calls: int = 1) -> None:
+        with self._lock:
+            self.syscalls[syscall] += calls
+
+    def add_error(self, phase: str) -> None:
+        with self._lock:
+            self.errors[phase] += 1
+
+    def observe_move(self, seconds: float, size: int) -> None:
+        """Count a move with its latency and the bytes it moved."""
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        with self._lock:
+            self.latency_counts[bucket] += 1
+            self.latency_sum += seconds
+            self.thread_seconds['move'] = self.thread_seconds.get('move', 0.0) + seconds
+            self.syscalls['rename'] += 1
+            self.bytes += size
+
+    def latency_percentile(self, fraction: float) -> float | None:
+        """Upper bound of the latency bucket holding a fraction of the moves, like 0.99. None without moves."""
+        total = sum(self.latency_counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.latency_counts):
+            seen += count
+            if seen >= fraction * total:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.latency_counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+        return {
+            'format': STATS_FORMAT,
+            'version': STATS_VERSION,
+            'operation': self.operation,
+            'directory': self.directory,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started)),
+            'elapsed_seconds': round(self.elapsed, 6),
+            'files': self.files,
+            'bytes': self.bytes,
+            'phases': {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+            'thread_seconds': {work: round(seconds, 6) for work, seconds in self.thread_seconds.items()},
+            'syscalls': dict(sorted(self.syscalls.items())),
+            'errors': dict(sorted(self.errors.items())),
+            'move_latency': {'count': cumulative, 'sum_seconds': round(self.latency_sum, 6), 'buckets': buckets},
+        }
+
+    def save_json(self, file_path: str) -> None:
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """Format the stats in the Prometheus text exposition format, for a node exporter's textfile collector."""
+        operation = f'operation="{_escape_label(self.operation)}"'
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{prefix}_{name}{suffix}{{{','.join((operation,) + labels)}}} {value!r}")
+
+        metric('run_seconds', 'gauge', "Wall time of the last run.", [('', (), self.elapsed)])
+        metric('files', 'gauge', "Files moved by the last run.", [('', (), self.files)])
+        metric('bytes', 'gauge', "Bytes moved by the last run.", [('', (), self.bytes)])
+        metric('phase_seconds', 'gauge', "Wall time of each phase of the last run.",
+               [('', (f'phase="{_escape_label(phase)}"',), seconds) for phase, seconds in sorted(self.phases.items())])
+        metric('thread_seconds', 'gauge', "Time spent on each kind of work, summed over the threads.",
+               [('', (f'work="{_escape_label(work)}"',), seconds)
+                for work, seconds in sorted(self.thread_seconds.items())])
+        metric('syscalls', 'gauge', "Filesystem calls made by the last run.",
+               [('', (f'call="{_escape_label(call)}"',), count) for call, count in sorted(self.syscalls.items())])
+        metric('errors', 'gauge', "Errors of the last run, by phase.",
+               [('', (f'phase="{_escape_label(phase)}"',), count) for phase, count in sorted(self.errors.items())])
+
+        cumulative = 0
+        samples = []
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), self.latency_counts):
+            cumulative += count
+            samples.append(('_bucket', ('le="+Inf"' if bound == float('inf') else f'le="{bound!r}"',), cumulative))
+        samples.append(('_sum', (), self.latency_sum))
+        samples.append(('_count', (), cumulative))
+        metric('move_latency_seconds', 'histogram', "Latency of the moves of the last run.", samples)
+        return '\n'.join(lines) + '\n'
+
+    def save_prometheus(self, file_path: str, prefix: str = METRIC_PREFIX) -> None:
+        """Write the Prometheus text format atomically, so a collector never reads half a file."""
+        temporary_path = file_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(temporary_path, file_path)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@contextmanager
+def profiled(output_path: str) -> Iterator[cProfile.Profile]:
+    """
+    Profile a block with cProfile and write the result to output_path, readable with pstats or snakeviz.
+
+    Only the calling thread is profiled, moves spread over workers are not seen.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path)
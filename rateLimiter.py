@@ -0,0 +1,271 @@
+import argparse
+import errno
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict
+
+# Seconds of a bucket's rate it may spend at once after being idle, kept short so limits hold over short windows
+BURST_SECONDS = 0.1
+# Longest wait before a waiting thread looks at its bucket again, so new limits apply to threads already waiting
+MAX_WAIT = 0.25
+
+# Minimum seconds between two adjustments of the adaptive share
+ADJUST_INTERVAL = 0.25
+# Share of the limits kept after moves got slower than the target latency, and share given back when they are not
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEP = 0.05
+# Weight of the newest latency in the moving average compared with the target
+LATENCY_SMOOTHING = 0.2
+
+# Errors the storage reports when it is overloaded, handled like slow moves
+BUSY_ERRNOS = {errno.EAGAIN, errno.EBUSY, errno.ETIMEDOUT}
+
+# Smallest number of bytes copied between two waits, so copies don't turn into many tiny calls
+MIN_COPY_CHUNK = 64 * 1024
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+class TokenBucket:
+    def __init__(self, rate: float | None = None):
+        """
+        Token bucket allowing rate units per second on average, None for no limit.
+
+        Amounts larger than the bucket are allowed, the bucket then goes into debt and the next callers
+        wait until it's paid back, so a large copy is spread over time instead of being refused.
+        """
+        self._condition = threading.Condition()
+        self.rate: float | None = None
+        self.capacity = 1.0
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: float | None) -> None:
+        """Change the rate, waking up the threads waiting so they use it right away."""
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Rate must be positive: {rate}")
+        with self._condition:
+            self._refill()
+            self.rate = rate
+            if rate is not None:
+                self.capacity = max(1.0, rate * BURST_SECONDS)
+                self.tokens = min(self.tokens, self.capacity)
+            self._condition.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> None:
+        """Wait until amount units are allowed and take them."""
+        if self.rate is None:
+            return
+        with self._condition:
+            while True:
+                self._refill()
+                if self.rate is None:
+                    return
+                # Waiting for more than a full bucket would never end, larger amounts are taken on credit
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                self._condition.wait(min(MAX_WAIT, (needed - self.tokens) / self.rate))
+
+
+class RateLimiter:
+    def __init__(self, ops_per_second: float | None = None, bytes_per_second: float | None = None,
+                 target_latency: float | None = None, min_share: float = 0.05, share: float = 1.0):
+        """
+        Bound the load put on the storage by moves: file operations per second, and bytes per second
+        copied across devices. Limits can be changed at any time, from another thread or a limits file.
+
+        With a target latency, the limits adapt to the storage: when the average latency of the moves
+        gets above the target, or the storage reports it is busy, the limits are halved, down to min_share
+        of their configured value, then given back in small steps while moves are fast again. The
+        adaptation scales the configured limits, so it needs at least one of them.
+
+        Args:
+            ops_per_second (float | None): Maximum file operations per second, None for no limit
+            bytes_per_second (float | None): Maximum bytes copied per second across devices, None for no limit
+            target_latency (float | None): Move latency in seconds above which the limits are lowered,
+                                           None to keep them fixed
+            min_share (float): Smallest fraction of the configured limits the adaptation goes down to
+            share (float): Fraction of the configured limits this limiter uses, when several processes share them
+        """
+        if not 0 < min_share <= 1 or not 0 < share <= 1:
+            raise ValueError(f"Shares must be between 0 and 1: min_share={min_share}, share={share}")
+        self.operations = TokenBucket()
+        self.bytes = TokenBucket()
+        self.target_latency = target_latency
+        self.min_share = min_share
+        self.share = share
+        self.ops_per_second: float | None = None
+        self.bytes_per_second: float | None = None
+
+        self._lock = threading.Lock()
+        # Fraction of the limits currently allowed by the adaptation
+        self.adaptive_share = 1.0
+        self.average_latency = 0.0
+        self._last_adjustment = time.monotonic()
+
+        # Optional limits file, reloaded when it changes
+        self.limits_path: str | None = None
+        self._limits_mtime = None
+        self._check_interval = 1.0
+        self._next_check = 0.0
+
+        self.set_limits(ops_per_second, bytes_per_second)
+
+    def set_limits(self, ops_per_second: float | None, bytes_per_second: float | None) -> None:
+        """
+        Change the configured limits, None or 0 removing a limit. Threads already waiting use them right away.
+        Raises ValueError for a limit that isn't a positive number, the current limits are then kept.
+        """
+        ops_per_second = _check_limit(ops_per_second)
+        bytes_per_second = _check_limit(bytes_per_second)
+        with self._lock:
+            self.ops_per_second = ops_per_second
+            self.bytes_per_second = bytes_per_second
+            self._apply()
+
+    def get_limits(self) -> Dict[str, float | None]:
+        return {'ops_per_second': self.ops_per_second, 'bytes_per_second': self.bytes_per_second}
+
+    def _apply(self) -> None:
+        scale = self.share * self.adaptive_share
+        self.operations.set_rate(None if self.ops_per_second is None else self.ops_per_second * scale)
+        self.bytes.set_rate(None if self.bytes_per_second is None else self.bytes_per_second * scale)
+
+    def acquire_operation(self) -> None:
+        """Wait for the right to do one file operation."""
+        if self.limits_path is not None:
+            self._check_limits_file()
+        self.operations.acquire()
+
+    def acquire_bytes(self, count: int) -> None:
+        """Wait for the right to copy count more bytes."""
+        self.bytes.acquire(count)
+
+    def copy_chunk_size(self, chunk_size: int) -> int:
+        """Bytes to copy between two waits, about BURST_SECONDS worth at the current byte rate."""
+        rate = self.bytes.rate
+        if rate is None:
+            return chunk_size
+        return max(MIN_COPY_CHUNK, min(chunk_size, int(rate * BURST_SECONDS)))
+
+    def record_latency(self, seconds: float) -> None:
+        """Report how long a move took, lowering the limits when moves are slower than the target."""
+        if self.target_latency is None:
+            return
+        with self._lock:
+            self.average_latency += LATENCY_SMOOTHING * (seconds - self.average_latency)
+            self._adjust(self.average_latency > self.target_latency)
+
+    def record_busy(self) -> None:
+        """Report that the storage refused an operation because it is overloaded."""
+        if self.target_latency is None:
+            return
+        with self._lock:
+            self._adjust(True)
+
+    def _adjust(self, slow: bool) -> None:
+        # At most one adjustment per interval, whatever the number of moves, so it reacts to trends
+        now = time.monotonic()
+        if now - self._last_adjustment < ADJUST_INTERVAL:
+            return
+        self._last_adjustment = now
+        if slow:
+            share = max(self.min_share, self.adaptive_share * BACKOFF_FACTOR)
+        else:
+            share = min(1.0, self.adaptive_share + RECOVERY_STEP)
+        if share != self.adaptive_share:
+            self.adaptive_share = share
+            self._apply()
+
+    def watch(self, limits_path: str, interval: float = 1.0) -> None:
+        """
+        Take the limits from a JSON file, reloaded when it changes, so they can be changed from another
+        process while moves run. See save_limits.
+        """
+        self.limits_path = limits_path
+        self._limits_mtime = None
+        self._check_interval = interval
+        self._next_check = 0.0
+        self._check_limits_file()
+
+    def _check_limits_file(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._check_interval
+        try:
+            mtime = os.stat(self.limits_path).st_mtime_ns
+            if mtime == self._limits_mtime:
+                return
+            limits = load_limits(self.limits_path)
+        except (OSError, ValueError):
+            # Keep the current limits while the file is missing or being written
+            return
+        self._limits_mtime = mtime
+        try:
+            self.set_limits(limits.get('ops_per_second'), limits.get('bytes_per_second'))
+        except ValueError:
+            # A wrong file keeps the current limits, until it is fixed
+            return
+
+
+def _check_limit(limit) -> float | None:
+    """Validate a limit, returning None for no limit."""
+    if not limit:
+        return None
+    if isinstance(limit, bool) or not isinstance(limit, (int, float)) or not math.isfinite(limit) or limit < 0:
+        raise ValueError(f"A limit must be a positive number: {limit!r}")
+    return float(limit)
+
+
+def load_limits(limits_path: str) -> Dict[str, float | None]:
+    with open(limits_path) as f:
+        limits = json.load(f)
+    if not isinstance(limits, dict):
+        raise ValueError(f"Not a limits file: {limits_path}")
+    return limits
+
+
+def save_limits(limits_path: str, ops_per_second: float | None, bytes_per_second: float | None) -> None:
+    """Write a limits file atomically, running limiters watching it pick the new limits up within a second."""
+    temporary_path = limits_path + '.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump({'ops_per_second': ops_per_second, 'bytes_per_second': bytes_per_second}, f)
+    os.replace(temporary_path, limits_path)
+
+
+def parse_size(text: str) -> int:
+    """Parse a number of bytes with an optional K, M or G binary suffix, like '50M'."""
+    text = text.strip().upper().removesuffix('B').removesuffix('I')
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+    return int(float(text[:len(text) - len(unit)]) * _SIZE_UNITS[unit])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change the limits of running organizations watching a limits "
+                                                 "file. Leaving a limit out removes it.")
+    parser.add_argument('limits_file')
+    parser.add_argument('--max-ops', type=float, default=None, help="file operations per second")
+    parser.add_argument('--max-bandwidth', type=parse_size, default=None,
+                        help="bytes copied per second across devices, like 50M")
+    args = parser.parse_args()
+
+    save_limits(args.limits_file, args.max_ops, args.max_bandwidth)
+    print(f"Limits written to {args.limits_file}: {args.max_ops or 'unlimited'} operations/s, "
+          f"{args.max_bandwidth or 'unlimited'} bytes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import fnmatch
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass(frozen=True)
+class NameRule:
+    """Files whose whole name matches pattern go to category, whatever their extension."""
+    pattern: str
+    category: str
+    # pattern is a glob like 'IMG_*' by default, a regular expression when regex is True
+    regex: bool = False
+
+
+class RuleEngine:
+    def __init__(self, extension_maps: Dict[str, List[str]] | None = None, rules: Iterable[NameRule] = ()):
+        """
+        Compiled classifier of file names, by name rules then by their longest known extension.
+
+        Extensions are kept in a trie of their dot-separated parts, last part first, so a name is
+        classified with a single walk from its end whatever the number of extensions: 'backup.tar.gz'
+        matches '.tar.gz' before '.gz'. An extension listed in several categories belongs to the first one.
+
+        Name rules are checked before extensions, in order, all compiled into one regular expression.
+        Matching is case-insensitive.
+
+        Args:
+            extension_maps (Dict[str, List[str]] | None): Category -> extensions, in priority order
+            rules (Iterable[NameRule]): Name rules, the first matching one wins
+        """
+        # Exact extension -> category, for lookups of a whole extension
+        self.extensions: Dict[str, str] = {}
+        # Trie node: [category or None, children by extension part]
+        self._trie: list = [None, {}]
+        self.rules: List[NameRule] = []
+        self._rules_pattern: re.Pattern | None = None
+
+        if extension_maps is not None:
+            self.compile_extensions(extension_maps)
+        self.set_rules(rules)
+
+    def compile_extensions(self, extension_maps: Dict[str, List[str]]) -> None:
+        """Replace every extension with those of the maps, categories visited in map order."""
+        self.extensions = {}
+        self._trie = [None, {}]
+        for category, extensions in extension_maps.items():
+            for ext in extensions:
+                self.setdefault_extension(ext, category)
+
+    def setdefault_extension(self, file_extension: str, category: str) -> str:
+        """Give an extension to a category unless it already has one. Returns the extension's category."""
+        file_extension = file_extension.lower()
+        owner = self.extensions.setdefault(file_extension, category)
+        if owner == category:
+            self._trie_node(file_extension, create=True)[0] = category
+        return owner
+
+    def set_extension(self, file_extension: str, category: str) -> None:
+        """Give an extension to a category, replacing its current one."""
+        file_extension = file_extension.lower()
+        self.extensions[file_extension] = category
+        self._trie_node(file_extension, create=True)[0] = category
+
+    def remove_extension(self, file_extension: str) -> None:
+        """Forget an extension. Trie nodes are kept, they only cost memory until the next compile."""
+        file_extension = file_extension.lower()
+        if self.extensions.pop(file_extension, None) is not None:
+            self._trie_node(file_extension)[0] = None
+
+    def get_extension_category(self, file_extension: str) -> str | None:
+        """Get the category of a whole extension like '.tar.gz', or None if it is unknown."""
+        return self.extensions.get(file_extension.lower())
+
+    def _trie_node(self, file_extension: str, create: bool = False) -> list | None:
+        if not file_extension.startswith('.'):
+            # Only what follows a dot is an extension, such an entry could never match
+            return [None, {}]
+        node = self._trie
+        for part in reversed(file_extension[1:].split('.')):
+            children = node[1]
+            child = children.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = children[part] = [None, {}]
+            node = child
+        return node
+
+    def set_rules(self, rules: Iterable[NameRule]) -> None:
+        """Replace the name rules, compiling them into a single regular expression."""
+        self.rules = list(rules)
+        if not self.rules:
+            self._rules_pattern = None
+            return
+        # One named group per rule: the alternatives are tried in order, the group that matched names the rule
+        alternatives = [f"(?P<r{position}>{rule.pattern if rule.regex else fnmatch.translate(rule.pattern)})"
+                        for position, rule in enumerate(self.rules)]
+        self._rules_pattern = re.compile('|'.join(alternatives), re.IGNORECASE | re.DOTALL)
+
+    def match_rules(self, name: str) -> str | None:
+        """Get the category of the first name rule matching a file name, or None."""
+        if self._rules_pattern is None:
+            return None
+        match = self._rules_pattern.fullmatch(name)
+        if match is None:
+            return None
+        # Groups inside a rule close before the rule's own group, so the last one closed is the rule's
+        return self.rules[int(match.lastgroup[1:])].category
+
+    def split_extension(self, name: str) -> Tuple[str, str | None]:
+        """
+        Get the longest known extension of a file name with its category.
+
+        Unknown extensions are the last part, like os.path.splitext, with a None category.
+        Leading dots are part of the name, not an extension.
+        """
+        parts = name.lower().lstrip('.').split('.')
+        node = self._trie
+        category = None
+        start = len(parts)
+        # The first part is the name itself, never an extension
+        for position in range(len(parts) - 1, 0, -1):
+            node = node[1].get(parts[position])
+            if node is None:
+                break
+            if node[0] is not None:
+                category, start = node[0], position
+        if category is None:
+            return ('.' + parts[-1] if len(parts) > 1 else ''), None
+        return '.' + '.'.join(parts[start:]), category
+
+    def classify(self, name: str) -> Tuple[str | None, str | None]:
+        """
+        Classify a file name, returning (category, extension).
+
+        The extension is None when a name rule decided, the category is None when nothing matched.
+        """
+        category = self.match_rules(name)
+        if category is not None:
+            return category, None
+        file_extension, category = self.split_extension(name)
+        return category, file_extension
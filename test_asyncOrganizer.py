@@ -0,0 +1,30 @@
+import asyncio
+
+from asyncOrganizer import AsyncFolderOrganizer
+from folderOrganizer import FolderOrganizer
+from organizerEvents import FileMoved
+from test_folderOrganizer import snapshot
+
+
+def test_undo_with_files_named_like_category_folders(tmp_path):
+    for name in ('a.jpg', 'b.txt', 'Images', 'Others'):
+        (tmp_path / name).write_text(name)
+    before = snapshot(str(tmp_path))
+    events = []
+    organizer = FolderOrganizer(event_sink=events.append)
+
+    async def organize_and_undo():
+        async_organizer = AsyncFolderOrganizer(organizer, max_workers=4)
+        try:
+            async for _ in async_organizer.organize_folder(str(tmp_path)):
+                pass
+            events.clear()
+            return [progress async for progress in async_organizer.undo_last_operation()]
+        finally:
+            await async_organizer.close()
+
+    progress = asyncio.run(organize_and_undo())
+
+    assert snapshot(str(tmp_path)) == before
+    assert [report.error for report in progress] == [None] * 4
+    assert sum(isinstance(event, FileMoved) for event in events) == 4
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from folderOrganizer import FolderOrganizer
+from organizerEvents import OperationError
+
+
+def snapshot(directory: str) -> dict:
+    """Content of every file of a tree by relative path, empty folders left out."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path) as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+
+@pytest.mark.parametrize('collision_policy', ['rename', 'keep_newer', 'skip'])
+def test_parallel_undo_with_files_named_like_category_folders(tmp_path, collision_policy):
+    # Files named 'Images' and 'Others' can only go back once their folder is empty, whatever lane
+    # the other moves of that folder are undone in. Repeated since the lanes race.
+    for run in range(5):
+        directory = tmp_path / str(run)
+        directory.mkdir()
+        for i in range(300):
+            (directory / f"text{i}.txt").write_text(f"text{i}")
+            (directory / f"picture{i}.jpg").write_text(f"picture{i}")
+        (directory / 'Images').write_text('a file in the way of the Images folder')
+        (directory / 'Others').write_text('a file named like its own category folder')
+        before = snapshot(str(directory))
+
+        organizer = FolderOrganizer(collision_policy=collision_policy)
+        organizer.organize_folder(str(directory), workers=4)
+        assert (directory / 'Images').is_dir()
+        organizer.undo_last_operation(workers=4)
+
+        assert snapshot(str(directory)) == before
+        assert not organizer.move_histories
+
+
+@pytest.mark.parametrize('mode', ['flatten', 'in_place'])
+def test_tree_with_files_named_like_category_folders(tmp_path, mode):
+    # Whether such a file is walked before the files going into its folder depends on scandir order
+    events = []
+    for folder in (tmp_path, tmp_path / 'sub'):
+        folder.mkdir(exist_ok=True)
+        for i in range(50):
+            (folder / f"picture{i}.jpg").write_text(f"picture{i}")
+        (folder / 'Images').write_text(f"{folder.name} Images")
+        (folder / 'Others').write_text(f"{folder.name} Others")
+    before = snapshot(str(tmp_path))
+
+    organizer = FolderOrganizer(event_sink=events.append)
+    organizer.organize_tree(str(tmp_path), mode, workers=4)
+    assert [event for event in events if isinstance(event, OperationError)] == []
+    assert (tmp_path / 'Images').is_dir()
+    organizer.undo_last_operation(workers=4)
+
+    assert snapshot(str(tmp_path)) == before
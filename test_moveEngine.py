@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from moveEngine import MoveEngine
+
+
+def test_copy_falls_back_when_kernel_copy_returns_nothing(tmp_path):
+    # Like copy_file_range on procfs or some FUSE filesystems
+    data = os.urandom(300000)
+    (tmp_path / 'source').write_bytes(data)
+    engine = MoveEngine(chunk_size=100000)
+    engine._copy_file_range_chunk = lambda *args: 0
+
+    assert engine.copy_file(str(tmp_path / 'source'), str(tmp_path / 'copy')) == len(data)
+    assert (tmp_path / 'copy').read_bytes() == data
+
+
+def test_short_copy_keeps_the_source(tmp_path):
+    (tmp_path / 'source').write_bytes(b'data' * 1000)
+    engine = MoveEngine()
+    engine._copy_file_range_chunk = engine._sendfile_chunk = engine._read_write_chunk = lambda *args: 0
+
+    with pytest.raises(OSError):
+        engine.move_across_devices(str(tmp_path / 'source'), str(tmp_path / 'moved'))
+    assert (tmp_path / 'source').read_bytes() == b'data' * 1000
+    assert not (tmp_path / 'moved').exists()
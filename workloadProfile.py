@@ -0,0 +1,114 @@
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict, List
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    """
+    Shape of a generated test directory, to reproduce what real folders look like.
+
+    Extensions are drawn from the extension maps with Zipf-distributed popularity, some files have
+    no extension or one no category knows, sizes follow a heavy-tailed distribution, files can be
+    nested in subfolders, and some names collide with what the organizer creates.
+    """
+    name: str = 'custom'
+    # Popularity of the rank-th most common extension is proportional to 1 / rank ** extension_zipf, 0 is uniform
+    extension_zipf: float = 1.0
+    # Fractions of the files with no extension, and with an extension missing from the maps
+    no_extension_fraction: float = 0.0
+    unknown_extension_fraction: float = 0.0
+    unknown_extension_count: int = 50
+    # 'empty', 'fixed', 'lognormal' or 'pareto', with the median size in bytes
+    size_distribution: str = 'empty'
+    size_median: int = 64 * 1024
+    # Spread of lognormal sizes, and tail index of pareto sizes (smaller is heavier)
+    size_sigma: float = 2.0
+    size_alpha: float = 1.2
+    max_size: int = 1024 ** 3
+    # Sized files only take disk space when not sparse
+    sparse: bool = True
+    # Fraction of the files put in subfolders up to max_depth levels deep, with folders_per_level folders per level
+    nested_fraction: float = 0.0
+    max_depth: int = 0
+    folders_per_level: int = 4
+    # Fraction of the files whose name is already taken in their category folder
+    collision_rate: float = 0.0
+    # Number of files named like a category folder, in the way of that folder
+    category_name_files: int = 0
+
+    def __post_init__(self):
+        if self.size_distribution not in ('empty', 'fixed', 'lognormal', 'pareto'):
+            raise ValueError(f"Unknown size distribution: {self.size_distribution}")
+        if self.no_extension_fraction + self.unknown_extension_fraction > 1:
+            raise ValueError("no_extension_fraction and unknown_extension_fraction add up to more than 1")
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> 'WorkloadProfile':
+        """Build a profile from a dict, starting from the preset named by its 'extends' key if any."""
+        values = dict(values)
+        base = get_profile(values.pop('extends')) if 'extends' in values else cls()
+        unknown = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown workload profile settings: {', '.join(sorted(unknown))}")
+        return replace(base, **values)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'WorkloadProfile':
+        """Read a profile from a JSON file."""
+        with open(file_path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def extension_weights(self, count: int) -> List[float]:
+        """Cumulative Zipf weights of count extensions ranked by popularity, for random.choices."""
+        cumulative, total = [], 0.0
+        for rank in range(1, count + 1):
+            total += 1 / rank ** self.extension_zipf
+            cumulative.append(total)
+        return cumulative
+
+    def draw_size(self, rng: random.Random) -> int:
+        """Draw a file size in bytes."""
+        if self.size_distribution == 'empty':
+            return 0
+        if self.size_distribution == 'fixed':
+            size = self.size_median
+        elif self.size_distribution == 'lognormal':
+            size = rng.lognormvariate(math.log(self.size_median), self.size_sigma)
+        else:
+            # Scale chosen so that the median is size_median
+            size = rng.paretovariate(self.size_alpha) * self.size_median / 2 ** (1 / self.size_alpha)
+        return min(int(size), self.max_size)
+
+
+# Named presets, a config file can extend one of them
+PRESETS: Dict[str, WorkloadProfile] = {
+    # Every extension equally likely and empty files, like generate_test_files
+    'uniform': WorkloadProfile(name='uniform', extension_zipf=0.0),
+    # A downloads folder: a few extensions dominate, odd names, heavy-tailed sizes, leftovers of past runs
+    'downloads': WorkloadProfile(name='downloads', extension_zipf=1.1, no_extension_fraction=0.03,
+                                 unknown_extension_fraction=0.05, size_distribution='lognormal',
+                                 size_median=256 * 1024, size_sigma=2.5, collision_rate=0.02,
+                                 category_name_files=1),
+    # Media dumps: a handful of formats, much larger files
+    'media': WorkloadProfile(name='media', extension_zipf=1.5, size_distribution='pareto',
+                             size_median=8 * 1024 ** 2, size_alpha=1.1, max_size=16 * 1024 ** 3),
+    # Project trees for recursive organization: most files in subfolders
+    'nested': WorkloadProfile(name='nested', extension_zipf=1.0, no_extension_fraction=0.1,
+                              unknown_extension_fraction=0.1, size_distribution='lognormal',
+                              size_median=8 * 1024, nested_fraction=0.8, max_depth=5, folders_per_level=6),
+}
+
+
+def get_profile(name_or_path: str) -> WorkloadProfile:
+    """Get a preset by name, or load a profile from a JSON file."""
+    if name_or_path in PRESETS:
+        return PRESETS[name_or_path]
+    if name_or_path.endswith('.json'):
+        return WorkloadProfile.load(name_or_path)
+    raise ValueError(f"Unknown workload profile: {name_or_path}, presets are {', '.join(PRESETS)}")